@@ -1,8 +1,10 @@
 import json
 from typing import List, Dict
-from langchain_core.messages import SystemMessage, HumanMessage
-from src.core.llm import get_llm
-from src.prompts import PLANNER_PROMPT
+from src.core.llm import get_llm, build_messages
+from src.core.metrics import record_llm_usage, metrics
+from src.core.budget import deadline_near
+from src.core.config import settings
+from src.prompts import PLANNER_PROMPT, PLANNER_INPUT
 from src.models import ResearchState
 
 async def planner_node(state: ResearchState) -> Dict:
@@ -13,16 +15,19 @@ async def planner_node(state: ResearchState) -> Dict:
     
     llm = get_llm(json_mode=True)
     
-    messages = [
-        SystemMessage(content=PLANNER_PROMPT.format(task=state['task'])),
-        HumanMessage(content="请开始规划。")
-    ]
+    messages = build_messages(PLANNER_PROMPT, state['task'], PLANNER_INPUT)
     
     response = await llm.ainvoke(messages)
+    record_llm_usage("planner", response)
     try:
         result = json.loads(response.content)
         queries = result.get("queries", [])
         print(f"--- [Planner] Generated queries: {queries} ---")
+        # 时间紧张时只保留前两个查询，给后续环节留出时间
+        if len(queries) > 2 and deadline_near(state, 2 * settings.REPORT_RESERVE_SECONDS):
+            print("--- [Planner] Deadline approaching, limiting to 2 queries ---")
+            metrics.incr("deadline_cuts_total.planner")
+            return {"sub_queries": queries[:2], "notes": [], "review_count": 0, "deadline_reached": True}
         return {"sub_queries": queries, "notes": [], "review_count": 0}
     except Exception as e:
         print(f"Error parsing planner output: {e}")
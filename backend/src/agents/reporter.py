@@ -1,33 +1,47 @@
 from typing import Dict, AsyncIterator
-from langchain_core.messages import SystemMessage, HumanMessage
-from src.core.llm import get_llm
-from src.prompts import REPORTER_PROMPT
+from src.core.llm import get_llm, build_messages
+from src.core.metrics import record_llm_usage, metrics
+from src.core.budget import time_remaining
+from src.prompts import REPORTER_PROMPT, REPORTER_INPUT
 from src.models import ResearchState
 
+# 已超过截止时间时，只基于相关度最高的若干条笔记撰写报告以缩短生成时间
+OVERDUE_MAX_NOTES = 10
+
 
 async def reporter_node(state: ResearchState) -> Dict:
     """
     Reporter Agent: 撰写最终报告 (使用流式输出)
     使用 astream 替代 ainvoke 实现真正的流式输出
     """
-    print(f"--- [Reporter] Generating final report based on {len(state['notes'])} notes ---")
+    notes = state['notes']
+    remaining = time_remaining(state)
+    trimmed = remaining is not None and remaining < 0 and len(notes) > OVERDUE_MAX_NOTES
+    if trimmed:
+        top = {id(n) for n in sorted(notes, key=lambda n: n.relevance, reverse=True)[:OVERDUE_MAX_NOTES]}
+        notes = [n for n in notes if id(n) in top]
+        metrics.incr("deadline_cuts_total.reporter")
+    print(f"--- [Reporter] Generating final report based on {len(notes)} notes ---")
 
     notes_text = ""
-    for idx, note in enumerate(state['notes']):
+    for idx, note in enumerate(notes):
         notes_text += f"Source [{idx+1}]: {note.source_title} ({note.source_url})\nContent: {note.content}\n\n"
 
     llm = get_llm()
 
-    messages = [
-        SystemMessage(content=REPORTER_PROMPT.format(task=state['task'], notes=notes_text)),
-        HumanMessage(content="请撰写报告。")
-    ]
+    messages = build_messages(REPORTER_PROMPT, state['task'], REPORTER_INPUT.format(notes=notes_text))
 
     # 使用 astream 进行流式输出，添加 tags 以便在 main.py 中捕获
     report_content = ""
+    usage_chunk = None
     async for chunk in llm.astream(messages, config={"tags": ["reporter"]}):
         if chunk.content:
             report_content += chunk.content
+        if chunk.usage_metadata:
+            usage_chunk = chunk
+    record_llm_usage("reporter", usage_chunk)
 
     print("--- [Reporter] Report generated successfully ---")
+    if trimmed:
+        return {"report_content": report_content, "deadline_reached": True}
     return {"report_content": report_content}
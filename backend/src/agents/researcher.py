@@ -1,10 +1,30 @@
-from typing import Dict, List, Set
-from langchain_core.messages import SystemMessage, HumanMessage
+import re
+import asyncio
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Set, Tuple, Iterable, Iterator, Optional
 from langchain_core.callbacks import AsyncCallbackHandler
-from src.core.llm import get_llm
+from src.core.llm import get_llm, build_messages
 from src.tools.search import search_tool
-from src.prompts import RESEARCHER_PROMPT
+from src.tools.passages import Passage, select_passages, estimate_tokens
+from src.core.config import settings
+from src.core.budget import deadline_near
+from src.prompts import RESEARCHER_PROMPT, RESEARCHER_INPUT
 from src.models import ResearchState, Note
+from src.core.metrics import metrics, record_llm_usage
+
+# 笔记提取缓存：同一任务下的相同查询不再重复调用 LLM
+# 只在作用域内生效 (一次研究运行或一个批量任务)，随上下文传递到其创建的异步任务中，
+# 作用域结束即释放，重新运行同一任务时会得到新的笔记
+_notes_cache: ContextVar[Optional[Dict[str, List[Note]]]] = ContextVar("notes_cache", default=None)
+
+# Reviewer 流式输出期间推测启动的查询任务: "运行 ID:查询键" -> (任务, 是否包含笔记提取)
+# 按运行区分，避免并发的相同任务互相取用或取消对方的推测任务
+_speculative: Dict[str, Tuple[asyncio.Task, bool]] = {}
+
+# 笔记中引用段落的标注，如 [P2]
+_PASSAGE_REF_PATTERN = re.compile(r"\s*\[P(\d+)\]")
 
 
 def dedupe_notes(notes: List[Note]) -> List[Note]:
@@ -20,39 +40,153 @@ def dedupe_notes(notes: List[Note]) -> List[Note]:
     return unique
 
 
-async def process_query(query: str, task: str) -> List[Note]:
+def attribute_notes(content: str, passages: List[Passage]) -> List[Note]:
+    """
+    按 [P编号] 标注把笔记要点归属到对应段落的来源，每个来源生成一条笔记
+    未标注的行归属到得分最高的段落
+    """
+    max_score = max(p.score for p in passages) or 1.0
+    grouped: Dict[str, List[str]] = {}
+    relevance: Dict[str, float] = {}
+    titles: Dict[str, str] = {}
+
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        refs = [int(n) for n in _PASSAGE_REF_PATTERN.findall(line) if 0 < int(n) <= len(passages)]
+        passage = passages[refs[0] - 1] if refs else passages[0]
+        grouped.setdefault(passage.url, []).append(_PASSAGE_REF_PATTERN.sub("", line).rstrip())
+        relevance[passage.url] = max(relevance.get(passage.url, 0.0), passage.score / max_score)
+        titles[passage.url] = passage.title
+
+    return [
+        Note(
+            content="\n".join(lines),
+            source_url=url,
+            source_title=titles[url],
+            relevance=round(min(1.0, relevance[url]), 2)
+        )
+        for url, lines in grouped.items()
+    ]
+
+
+@contextmanager
+def notes_cache_scope(cache: Optional[Dict[str, List[Note]]] = None) -> Iterator[Dict[str, List[Note]]]:
+    """
+    在作用域内 (包括其中创建的异步任务) 启用笔记提取缓存
+    """
+    cache = {} if cache is None else cache
+    token = _notes_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _notes_cache.reset(token)
+
+
+def _query_key(task: str, query: str, max_results: int) -> str:
+    return hashlib.md5(f"{task}:{query}:{max_results}".encode()).hexdigest()
+
+
+def _speculative_key(run_id: str, cache_key: str) -> str:
+    return f"{run_id}:{cache_key}"
+
+
+def start_speculative_query(query: str, task: str, max_results: int, run_id: str, extract: bool = False) -> str:
+    """
+    在 Reviewer 决策完成前提前启动查询的搜索 (可选同时提取笔记)，返回任务键
+    之后同一运行的 researcher 处理该查询时直接复用其结果
+    """
+    cache_key = _query_key(task, query, max_results)
+    key = _speculative_key(run_id, cache_key)
+    if key in _speculative or cache_key in (_notes_cache.get() or {}):
+        return key
+    if extract:
+        coro = _run_query(query, task, max_results, cache_key)
+    else:
+        coro = search_tool.search(query, max_results=max_results)
+    _speculative[key] = (asyncio.create_task(coro), extract)
+    metrics.incr("speculative_started_total")
+    print(f"--- [Researcher] Speculative {'extraction' if extract else 'search'} started: {query} ---")
+    return key
+
+
+def cancel_speculative(keys: Iterable[str]):
+    """
+    取消尚未被使用的推测查询
+    """
+    for key in keys:
+        entry = _speculative.pop(key, None)
+        if entry and not entry[0].done():
+            entry[0].cancel()
+            metrics.incr("speculative_cancelled_total")
+
+
+def cancel_run_speculative(run_id: str):
+    """
+    取消某次运行剩余的全部推测查询
+    """
+    prefix = _speculative_key(run_id, "")
+    cancel_speculative([key for key in _speculative if key.startswith(prefix)])
+
+
+async def process_query(query: str, task: str, max_results: int = 3, run_id: str = "") -> List[Note]:
     """
     处理单个查询：搜索 -> 摘要
     """
+    cache_key = _query_key(task, query, max_results)
+
+    speculative = _speculative.pop(_speculative_key(run_id, cache_key), None)
+    if speculative:
+        spec_task, extracted = speculative
+        metrics.incr("speculative_hits_total")
+        try:
+            await asyncio.wait({spec_task})
+        except asyncio.CancelledError:
+            spec_task.cancel()
+            raise
+        # 推测任务失败时按正常流程重新执行；仅搜索时结果已在搜索缓存中
+        if not spec_task.cancelled() and spec_task.exception() is None and extracted:
+            return spec_task.result()
+
+    notes_cache = _notes_cache.get()
+    if notes_cache is not None and cache_key in notes_cache:
+        print(f"--- [Researcher] Extraction cache hit for: {query} ---")
+        metrics.incr("extraction_cache_hits_total")
+        return notes_cache[cache_key]
+    metrics.incr("extraction_cache_misses_total")
+
+    return await _run_query(query, task, max_results, cache_key)
+
+
+async def _run_query(query: str, task: str, max_results: int, cache_key: str) -> List[Note]:
     print(f"--- [Researcher] Searching: {query} ---")
-    results = await search_tool.search(query, max_results=3)
+    results = await search_tool.search(query, max_results=max_results)
 
     if not results:
         return []
 
+    # 只把与查询最相关的段落 (BM25 排序) 在 token 预算内发送给 LLM
+    passages = select_passages(query, results, token_budget=settings.PASSAGE_TOKEN_BUDGET)
+    if not passages:
+        return []
+
     context = ""
-    for idx, res in enumerate(results):
-        context += f"Result {idx+1}:\nTitle: {res.get('title')}\nURL: {res.get('url')}\nContent: {res.get('content')}\n\n"
+    for idx, passage in enumerate(passages):
+        context += f"[P{idx+1}] {passage.title} ({passage.url})\n{passage.text}\n\n"
+    metrics.observe("researcher_context_tokens", estimate_tokens(context))
 
     llm = get_llm()
-    messages = [
-        SystemMessage(content=RESEARCHER_PROMPT.format(task=task, query=query, content=context)),
-        HumanMessage(content="请提取笔记。")
-    ]
+    messages = build_messages(RESEARCHER_PROMPT, task, RESEARCHER_INPUT.format(query=query, content=context))
 
     try:
         # 异步调用 LLM
         response = await llm.ainvoke(messages)
-        content = response.content
-
-        primary_source = results[0]
-        note = Note(
-            content=content,
-            source_url=primary_source.get('url', ''),
-            source_title=primary_source.get('title', 'Unknown Source'),
-            relevance=0.9
-        )
-        return [note]
+        record_llm_usage("researcher", response)
+        notes = attribute_notes(response.content, passages)
+        notes_cache = _notes_cache.get()
+        if notes_cache is not None:
+            notes_cache[cache_key] = notes
+        return notes
     except Exception as e:
         print(f"Error processing query {query}: {e}")
         return []
@@ -66,14 +200,29 @@ async def researcher_node(state: ResearchState) -> Dict:
     print(f"--- [Researcher] Processing {len(state['sub_queries'])} queries sequentially ---")
 
     all_notes = list(state.get("notes", []))
+    max_results = state.get("max_results", settings.SEARCH_MAX_RESULTS)
+    run_id = state.get("run_id", "")
+    deadline_reached = False
 
-    for idx, query in enumerate(state['sub_queries']):
-        print(f"--- [Researcher] Query {idx + 1}/{len(state['sub_queries'])}: {query} ---")
-        notes = await process_query(query, state['task'])
-        all_notes.extend(notes)
+    try:
+        for idx, query in enumerate(state['sub_queries']):
+            # 临近截止时间时停止剩余查询 (至少保证有笔记可写报告)
+            if all_notes and deadline_near(state):
+                print(f"--- [Researcher] Deadline approaching, skipping {len(state['sub_queries']) - idx} queries ---")
+                metrics.incr("deadline_cuts_total.researcher")
+                deadline_reached = True
+                break
+            print(f"--- [Researcher] Query {idx + 1}/{len(state['sub_queries'])}: {query} ---")
+            notes = await process_query(query, state['task'], max_results, run_id)
+            all_notes.extend(notes)
+    finally:
+        # 跳过的查询 (截止时间、取消或异常) 不再需要推测结果
+        cancel_run_speculative(run_id)
 
     # 去重 notes
     all_notes = dedupe_notes(all_notes)
     print(f"--- [Researcher] Total unique notes: {len(all_notes)} ---")
 
+    if deadline_reached:
+        return {"notes": all_notes, "deadline_reached": True}
     return {"notes": all_notes}
@@ -1,8 +1,13 @@
 import json
+import asyncio
 from typing import Dict
-from langchain_core.messages import SystemMessage, HumanMessage
-from src.core.llm import get_llm
-from src.prompts import REVIEWER_PROMPT
+from src.core.llm import get_llm, build_messages
+from src.core.metrics import record_llm_usage, metrics
+from src.core.budget import deadline_near
+from src.core.config import settings
+from src.tools.json_stream import StreamingArrayParser
+from src.agents.researcher import start_speculative_query, cancel_speculative
+from src.prompts import REVIEWER_PROMPT, REVIEWER_INPUT
 from src.models import ResearchState
 
 
@@ -18,22 +23,43 @@ async def reviewer_node(state: ResearchState) -> Dict:
         print("--- [Reviewer] Max loops reached. Proceeding to report. ---")
         return {"review_count": current_loop + 1, "feedback": "Max loops reached", "sub_queries": []}
 
+    if deadline_near(state):
+        print("--- [Reviewer] Deadline approaching. Proceeding to report. ---")
+        metrics.incr("deadline_cuts_total.reviewer")
+        return {"review_count": current_loop + 1, "feedback": "Deadline approaching", "sub_queries": [], "deadline_reached": True}
+
     notes_text = ""
     for idx, note in enumerate(state['notes']):
         notes_text += f"[{idx+1}] {note.source_title}: {note.content[:200]}...\n"
 
     llm = get_llm(json_mode=True)
 
-    messages = [
-        SystemMessage(content=REVIEWER_PROMPT.format(task=state['task'], notes=notes_text)),
-        HumanMessage(content="请审查并给出决策。")
-    ]
+    messages = build_messages(REVIEWER_PROMPT, state['task'], REVIEWER_INPUT.format(notes=notes_text))
+
+    # 边生成边解析 new_queries，每个查询的字符串一闭合就推测启动搜索，隐藏搜索延迟
+    parser = StreamingArrayParser("new_queries") if settings.SPECULATIVE_SEARCH else None
+    max_results = state.get("max_results", settings.SEARCH_MAX_RESULTS)
+    run_id = state.get("run_id", "")
+    speculative: Dict[str, str] = {}
 
     # 使用 astream 进行流式输出，添加 tags 以便在 main.py 中捕获
     full_response = ""
-    async for chunk in llm.astream(messages, config={"tags": ["reviewer"]}):
-        if chunk.content:
-            full_response += chunk.content
+    usage_chunk = None
+    try:
+        async for chunk in llm.astream(messages, config={"tags": ["reviewer"]}):
+            if chunk.content:
+                full_response += chunk.content
+                if parser:
+                    for query in parser.feed(chunk.content):
+                        speculative[query] = start_speculative_query(
+                            query, state['task'], max_results, run_id, settings.SPECULATIVE_EXTRACTION
+                        )
+            if chunk.usage_metadata:
+                usage_chunk = chunk
+    except (asyncio.CancelledError, Exception):
+        cancel_speculative(speculative.values())
+        raise
+    record_llm_usage("reviewer", usage_chunk)
 
     try:
         result = json.loads(full_response)
@@ -44,11 +70,14 @@ async def reviewer_node(state: ResearchState) -> Dict:
         print(f"--- [Reviewer] Satisfactory: {satisfactory}, Feedback: {feedback} ---")
 
         if satisfactory:
+            cancel_speculative(speculative.values())
             return {"review_count": current_loop + 1, "feedback": feedback, "sub_queries": []}
         else:
             print(f"--- [Reviewer] New queries: {new_queries} ---")
+            cancel_speculative(key for query, key in speculative.items() if query not in new_queries)
             return {"review_count": current_loop + 1, "feedback": feedback, "sub_queries": new_queries}
 
     except Exception as e:
         print(f"Error parsing reviewer output: {e}")
+        cancel_speculative(speculative.values())
         return {"review_count": current_loop + 1, "feedback": "Error parsing output", "sub_queries": []}
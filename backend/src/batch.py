@@ -0,0 +1,220 @@
+"""
+批量研究任务运行器
+
+输入为 JSONL 文件，每行一个任务:
+    {"id": "moe", "task": "分析 DeepSeek MoE 架构的核心优势", "max_loops": 2}
+
+结果逐行追加写入输出 JSONL，输出文件同时作为检查点：重新运行同一批次时，
+已成功完成的任务会被跳过。所有任务共享同一个编译好的图、进程内的搜索缓存以及本批次的笔记缓存。
+
+用法:
+    python -m src.batch tasks.jsonl -o results.jsonl -c 3
+"""
+import json
+import time
+import asyncio
+import uuid
+import hashlib
+import argparse
+import contextlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Callable, AsyncContextManager
+from pydantic import BaseModel, Field
+
+from src.graph import get_graph, build_initial_state
+from src.database import create_db_and_tables, save_research_session
+from src.core.metrics import metrics
+from src.core.config import settings
+from src.agents.researcher import cancel_run_speculative, notes_cache_scope
+
+
+class BatchTask(BaseModel):
+    id: str = Field("", description="Stable task id used for checkpointing (defaults to a hash of the task)")
+    task: str = Field(..., min_length=5, description="Research task description")
+    max_loops: int = Field(3, ge=1, le=5, description="Max research loops (depth)")
+
+
+def load_tasks(path: str) -> List[BatchTask]:
+    """
+    读取 JSONL 任务文件，跳过空行
+    """
+    tasks = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                task = BatchTask(**json.loads(line))
+            except Exception as e:
+                raise ValueError(f"Invalid task on line {line_no} of {path}: {e}") from e
+            if not task.id:
+                task.id = hashlib.md5(task.task.encode()).hexdigest()[:12]
+            tasks.append(task)
+    return tasks
+
+
+def load_completed_ids(path: str) -> Set[str]:
+    """
+    从已有的输出文件中读取成功完成的任务 ID (断点续跑)
+    """
+    completed: Set[str] = set()
+    output = Path(path)
+    if not output.exists():
+        return completed
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by an interrupted run; that task is simply retried
+                continue
+            if record.get("status") == "done":
+                completed.add(record["id"])
+    return completed
+
+
+class BatchRunner:
+    """
+    以可配置的并发度运行一批研究任务，并记录进度
+    slot 为每个任务运行前需进入的异步上下文 (按任务 ID 创建)，
+    在 API 中用于与流式研究共享并发名额；命令行运行时不做限制
+    """
+
+    def __init__(self, input_path: str, output_path: str, concurrency: int = 2, save_to_db: bool = True,
+                 slot: Optional[Callable[[str], AsyncContextManager]] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.save_to_db = save_to_db
+        self.slot = slot or (lambda task_id: contextlib.nullcontext())
+
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Counters recorded while this batch runs (cache hits etc.), separate from the process-wide metrics
+        self.counters: Dict[str, float] = {}
+        self._write_lock = asyncio.Lock()
+
+    def progress(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+        processed = self.completed + self.failed
+        return {
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "remaining": self.total - self.skipped - processed,
+            "elapsed_seconds": round(elapsed, 1),
+            "tasks_per_minute": round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            "search_cache_hits": int(self.counters.get("search_cache_hits_total", 0)),
+            "extraction_cache_hits": int(self.counters.get("extraction_cache_hits_total", 0)),
+        }
+
+    async def _write_result(self, record: Dict[str, Any]):
+        async with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def _run_task(self, graph, task: BatchTask, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            print(f"--- [Batch] Start {task.id}: {task.task} ---")
+            start = time.monotonic()
+            record: Dict[str, Any] = {"id": task.id, "task": task.task, "max_loops": task.max_loops}
+            try:
+                # Same time budget as streamed runs, so one slow task cannot stall the batch
+                async with self.slot(task.id):
+                    deadline = time.time() + settings.RUN_DEADLINE_SECONDS
+                    run_id = uuid.uuid4().hex
+                    try:
+                        result = await graph.ainvoke(
+                            build_initial_state(task.task, task.max_loops, deadline=deadline, run_id=run_id)
+                        )
+                    finally:
+                        cancel_run_speculative(run_id)
+                notes = [
+                    {"title": n.source_title, "url": n.source_url, "content": n.content[:200] + "..."}
+                    for n in result.get("notes", [])
+                ]
+                record.update({
+                    "status": "done",
+                    "report_content": result.get("report_content", ""),
+                    "notes": notes,
+                    "review_loops": result.get("review_count", 0),
+                })
+                self.completed += 1
+            except Exception as e:
+                print(f"--- [Batch] Task {task.id} failed: {e} ---")
+                record.update({"status": "error", "error": str(e)})
+                self.failed += 1
+
+            if self.save_to_db and record.get("report_content"):
+                try:
+                    record["db_id"] = save_research_session(task.task, record["report_content"], record["notes"])
+                except Exception as e:
+                    # The report is still in the output file, so a DB failure does not fail the task
+                    print(f"Error saving to DB: {e}")
+
+            record["elapsed_seconds"] = round(time.monotonic() - start, 2)
+            await self._write_result(record)
+            metrics.observe("batch_task_seconds", record["elapsed_seconds"])
+            done = self.completed + self.failed + self.skipped
+            print(f"--- [Batch] {done}/{self.total} {task.id} {record['status']} in {record['elapsed_seconds']}s ---")
+
+    async def run(self) -> Dict[str, Any]:
+        tasks = load_tasks(self.input_path)
+        completed_ids = load_completed_ids(self.output_path)
+        pending = [t for t in tasks if t.id not in completed_ids]
+
+        self.total = len(tasks)
+        self.skipped = self.total - len(pending)
+        self.status = "running"
+        self.started_at = time.monotonic()
+        if self.skipped:
+            print(f"--- [Batch] Resuming: {self.skipped} tasks already done ---")
+
+        if self.save_to_db:
+            create_db_and_tables()
+
+        # One compiled graph and one set of caches for the whole batch
+        graph = get_graph()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            # Tasks created by gather inherit both scopes: cache hits count towards this batch,
+            # and the notes cache is shared by the batch's tasks and dropped when it finishes
+            with metrics.scope(self.counters), notes_cache_scope():
+                await asyncio.gather(*(self._run_task(graph, t, semaphore) for t in pending))
+            self.status = "done"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception:
+            self.status = "error"
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+
+        summary = self.progress()
+        print(f"--- [Batch] Summary: {json.dumps(summary)} ---")
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run research tasks from a JSONL file")
+    parser.add_argument("input", help="JSONL file with one task per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="Output JSONL (also the resume checkpoint)")
+    parser.add_argument("-c", "--concurrency", type=int, default=2, help="Number of tasks to run in parallel")
+    parser.add_argument("--no-db", action="store_true", help="Do not save reports to the database")
+    args = parser.parse_args()
+
+    runner = BatchRunner(args.input, args.output, concurrency=args.concurrency, save_to_db=not args.no_db)
+    asyncio.run(runner.run())
+
+
+if __name__ == "__main__":
+    main()
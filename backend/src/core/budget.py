@@ -0,0 +1,42 @@
+import time
+from typing import Optional, Dict, Any
+from src.core.config import settings
+
+
+def time_remaining(state: Dict[str, Any]) -> Optional[float]:
+    """
+    距离本次研究截止时间的剩余秒数，未设置截止时间时为 None
+    """
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def deadline_near(state: Dict[str, Any], reserve: Optional[float] = None) -> bool:
+    """
+    剩余时间不足以在保留给报告生成的时间之外再做更多工作
+    """
+    remaining = time_remaining(state)
+    if remaining is None:
+        return False
+    if reserve is None:
+        reserve = settings.REPORT_RESERVE_SECONDS
+    return remaining <= reserve
+
+
+def plan_degradation(max_loops: int, max_results: int, queue_depth: int) -> Dict[str, Any]:
+    """
+    根据排队深度降低研究深度：每超过一次阈值，循环次数减一 (最少 1)，
+    并减少每个查询的搜索结果数 (最少 1)
+    """
+    threshold = settings.DEGRADE_QUEUE_DEPTH
+    if threshold <= 0 or queue_depth < threshold:
+        return {"max_loops": max_loops, "max_results": max_results, "degraded": False}
+
+    steps = queue_depth // threshold
+    return {
+        "max_loops": max(1, max_loops - steps),
+        "max_results": max(1, max_results - steps),
+        "degraded": True,
+    }
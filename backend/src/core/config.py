@@ -8,9 +8,29 @@ class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4-turbo-preview")
     OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+    # Ask for usage in streamed responses; disable for endpoints without stream_options support
+    OPENAI_STREAM_USAGE = os.getenv("OPENAI_STREAM_USAGE", "true").lower() == "true"
     
     TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+    # Token budget for the ranked web passages sent to the researcher per query
+    PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", "2000"))
+    # Max number of queries kept in the search cache (results include full page content)
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
     
+    # Time budget of a research run, and the part of it kept for the reporter
+    RUN_DEADLINE_SECONDS = float(os.getenv("RUN_DEADLINE_SECONDS", "300"))
+    REPORT_RESERVE_SECONDS = float(os.getenv("REPORT_RESERVE_SECONDS", "60"))
+    # Queue depth at which new runs start with reduced loops / search results
+    DEGRADE_QUEUE_DEPTH = int(os.getenv("DEGRADE_QUEUE_DEPTH", "2"))
+    SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "3"))
+    # Start searching reviewer queries while the reviewer is still streaming;
+    # optionally run the note extraction too (costs tokens if the queries are dropped)
+    SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "true").lower() == "true"
+    SPECULATIVE_EXTRACTION = os.getenv("SPECULATIVE_EXTRACTION", "false").lower() == "true"
+
+    # Directory that POST /batch input and output files are confined to
+    BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 settings = Settings()
@@ -1,14 +1,21 @@
+from functools import lru_cache
+from typing import List
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from langchain_openai import ChatOpenAI
 from src.core.config import settings
+from src.prompts import TASK_CONTEXT
 
+@lru_cache(maxsize=None)
 def get_llm(json_mode: bool = False):
     """
-    获取配置好的 LLM 实例
+    获取配置好的 LLM 实例 (按参数缓存，复用底层 HTTP 连接池)
     """
     kwargs = {
         "model": settings.OPENAI_MODEL_NAME,
         "api_key": settings.OPENAI_API_KEY,
         "temperature": 0,  # 保持确定性
+        # 流式调用也返回 token 用量 (含缓存命中的输入 token)
+        "stream_usage": settings.OPENAI_STREAM_USAGE,
     }
     
     if settings.OPENAI_API_BASE:
@@ -18,3 +25,14 @@ def get_llm(json_mode: bool = False):
         kwargs["model_kwargs"] = {"response_format": {"type": "json_object"}}
         
     return ChatOpenAI(**kwargs)
+
+def build_messages(system_prompt: str, task: str, call_input: str) -> List[BaseMessage]:
+    """
+    按"静态指令 -> 会话上下文 -> 单次调用内容"组装消息
+    前两部分在同一会话内字节一致，构成可被服务端缓存的稳定前缀
+    """
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=TASK_CONTEXT.format(task=task)),
+        HumanMessage(content=call_input),
+    ]
@@ -0,0 +1,90 @@
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+# 当前作用域 (如一个批量任务) 的计数器，随上下文传递到其创建的异步任务中
+_scoped_counters: ContextVar[Optional[Dict[str, float]]] = ContextVar("scoped_counters", default=None)
+
+
+class Metrics:
+    """
+    进程内的简单指标收集器 (计数器 + 耗时分布)
+    通过 /metrics 接口以 JSON 形式暴露
+    """
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._started_at = time.time()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        scoped = _scoped_counters.get()
+        with self._lock:
+            self._counters[name] += value
+            if scoped is not None:
+                scoped[name] = scoped.get(name, 0) + value
+
+    @contextmanager
+    def scope(self, counters: Dict[str, float]) -> Iterator[Dict[str, float]]:
+        """
+        在作用域内 (包括其中创建的异步任务) 额外把计数累加到 counters
+        """
+        token = _scoped_counters.set(counters)
+        try:
+            yield counters
+        finally:
+            _scoped_counters.reset(token)
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._observations[name].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            summaries = {}
+            for name, values in self._observations.items():
+                if not values:
+                    continue
+                ordered = sorted(values)
+                summaries[name] = {
+                    "count": len(ordered),
+                    "avg": round(sum(ordered) / len(ordered), 4),
+                    "p50": round(ordered[len(ordered) // 2], 4),
+                    "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+                    "max": round(ordered[-1], 4),
+                }
+            return {
+                "uptime_seconds": round(time.time() - self._started_at, 1),
+                "counters": dict(self._counters),
+                "observations": summaries,
+            }
+
+
+def usage_tokens(message: Any) -> Optional[int]:
+    """
+    从 LLM 返回的消息中读取 token 用量，服务端未返回时为 None
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    return usage.get("total_tokens")
+
+
+def record_llm_usage(node: str, message: Any) -> None:
+    """
+    按节点记录 LLM 输入 token 中缓存命中与未命中的数量，以及输出 token
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    metrics.incr(f"llm_cached_input_tokens.{node}", cached)
+    metrics.incr(f"llm_uncached_input_tokens.{node}", usage.get("input_tokens", 0) - cached)
+    metrics.incr(f"llm_output_tokens.{node}", usage.get("output_tokens", 0))
+
+
+metrics = Metrics()
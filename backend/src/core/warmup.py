@@ -0,0 +1,40 @@
+import asyncio
+from typing import Dict
+from openai import APIStatusError
+from src.core.config import settings
+from src.core.llm import get_llm
+from src.tools.search import search_tool
+
+# Warmup must never hold up startup for long
+WARMUP_TIMEOUT = 5.0
+
+
+async def warmup() -> Dict[str, str]:
+    """
+    启动预热：创建 LLM / 搜索客户端，并预先建立到 LLM 服务的连接
+    返回每项检查的结果，"ok" 表示可用
+    """
+    checks: Dict[str, str] = {}
+
+    if not settings.OPENAI_API_KEY:
+        checks["llm"] = "missing OPENAI_API_KEY"
+    else:
+        llm = get_llm()
+        get_llm(json_mode=True)
+        try:
+            # 任意轻量请求即可完成 DNS/TCP/TLS 握手，连接随后留在连接池中复用
+            await asyncio.wait_for(llm.root_async_client.models.list(), timeout=WARMUP_TIMEOUT)
+            checks["llm"] = "ok"
+        except APIStatusError as e:
+            # Some compatible endpoints do not implement /models; the connection is open anyway
+            checks["llm"] = "ok" if e.status_code == 404 else f"error: HTTP {e.status_code}"
+        except Exception as e:
+            checks["llm"] = f"error: {type(e).__name__}"
+
+    try:
+        await asyncio.to_thread(search_tool.warmup)
+        checks["search"] = "ok"
+    except ValueError as e:
+        checks["search"] = str(e)
+
+    return checks
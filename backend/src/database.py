@@ -1,4 +1,8 @@
+import json
+from typing import List, Dict, Any
 from sqlmodel import SQLModel, create_engine, Session
+from src.db_models import ResearchSession
+from src.exports import build_export
 
 sqlite_file_name = "database.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
@@ -12,3 +16,21 @@ def create_db_and_tables():
 def get_session():
     with Session(engine) as session:
         yield session
+
+def save_research_session(task: str, report_content: str, notes: List[Dict[str, Any]]) -> int:
+    """
+    保存一次研究结果，并同时生成预渲染导出，返回记录 ID
+    """
+    with Session(engine) as session:
+        db_session = ResearchSession(
+            task=task,
+            report_content=report_content,
+            notes_json=json.dumps(notes)
+        )
+        session.add(db_session)
+        session.commit()
+        session.refresh(db_session)
+        # Render exports once; reports never change after saving
+        session.add(build_export(db_session))
+        session.commit()
+        return db_session.id
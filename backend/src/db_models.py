@@ -18,3 +18,11 @@ class ResearchSession(SQLModel, table=True):
             return json.loads(self.notes_json)
         except:
             return []
+
+
+class ResearchExport(SQLModel, table=True):
+    """Pre-rendered exports of a saved report, generated once at save time"""
+    session_id: int = Field(primary_key=True, foreign_key="researchsession.id")
+    etag: str            # Content hash of the saved session
+    markdown: str        # Markdown with resolved citations and references
+    html: str            # Standalone HTML rendering of the markdown
@@ -0,0 +1,119 @@
+import re
+import html
+import hashlib
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+
+import nh3
+import markdown as markdown_lib
+
+from src.db_models import ResearchSession, ResearchExport
+
+# 与前端 useCitations.ts 保持一致: [Source N(url)] 或 [Source N (url)]
+CITATION_PATTERN = re.compile(r"\[Source\s*(\d+)\s*\(([^)]+)\)\]", re.IGNORECASE)
+
+# 引用链接只允许 http/https，避免 javascript: 等协议
+SAFE_URL_SCHEMES = {"http", "https"}
+
+# 导出的 HTML 禁止脚本，只允许内联样式与外部图片
+EXPORT_CSP = "default-src 'none'; img-src http: https: data:; style-src 'unsafe-inline'"
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<article>
+{body}
+</article>
+</body>
+</html>
+"""
+
+
+def content_etag(item: ResearchSession) -> str:
+    """
+    基于报告内容计算 ETag (报告保存后不会再变化)
+    """
+    digest = hashlib.sha256()
+    for part in (item.task, item.report_content, item.notes_json):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def safe_url(url: str) -> Optional[str]:
+    """
+    仅返回 http/https 链接 (空格转义)，其他协议返回 None
+    """
+    url = url.strip()
+    if urlparse(url).scheme.lower() not in SAFE_URL_SCHEMES:
+        return None
+    return url.replace(" ", "%20")
+
+
+def _escape_link_text(text: str) -> str:
+    return re.sub(r"([\\\[\]])", r"\\\1", text)
+
+
+def extract_citations(report: str, notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    提取报告中的引用，并优先使用笔记中的标题
+    """
+    titles = {note.get("url"): note.get("title") for note in notes if note.get("url")}
+    citations: Dict[int, Dict[str, Any]] = {}
+    for match in CITATION_PATTERN.finditer(report):
+        index = int(match.group(1))
+        url = match.group(2).strip()
+        if index not in citations:
+            citations[index] = {"index": index, "url": url, "title": titles.get(url) or f"Source {index}"}
+    return [citations[index] for index in sorted(citations)]
+
+
+def render_markdown(item: ResearchSession) -> str:
+    """
+    将 [Source N(url)] 替换为链接，并在末尾追加参考文献列表
+    """
+    report = item.report_content or ""
+    citations = extract_citations(report, item.notes)
+
+    def link(match: re.Match) -> str:
+        url = safe_url(match.group(2))
+        return f"[[{match.group(1)}]]({url})" if url else f"[{match.group(1)}]"
+
+    def reference(citation: Dict[str, Any]) -> str:
+        url = safe_url(citation["url"])
+        title = _escape_link_text(citation["title"])
+        return f"{citation['index']}. [{title}]({url})" if url else f"{citation['index']}. {title}"
+
+    body = CITATION_PATTERN.sub(link, report)
+
+    if citations:
+        references = "\n".join(reference(c) for c in citations)
+        body = f"{body.rstrip()}\n\n## References\n\n{references}\n"
+    return body
+
+
+def render_html(item: ResearchSession, markdown_text: str) -> str:
+    """
+    将导出的 Markdown 渲染为独立的 HTML 文档
+    报告内容来自 LLM 与网页，渲染结果需清洗掉原始 HTML 中的脚本、事件属性和危险链接
+    """
+    rendered = markdown_lib.markdown(markdown_text, extensions=["tables", "fenced_code"])
+    body = nh3.clean(rendered, url_schemes=SAFE_URL_SCHEMES | {"mailto"})
+    return HTML_TEMPLATE.format(title=html.escape(item.task), body=body)
+
+
+def build_export(item: ResearchSession) -> ResearchExport:
+    """
+    生成预渲染导出 (在保存报告时调用一次)
+    """
+    markdown_text = render_markdown(item)
+    return ResearchExport(
+        session_id=item.id,
+        etag=content_etag(item),
+        markdown=markdown_text,
+        html=render_html(item, markdown_text),
+    )
@@ -1,5 +1,8 @@
+import uuid
+from typing import Optional
 from langgraph.graph import StateGraph, END
 from src.models import ResearchState
+from src.core.config import settings
 from src.agents.planner import planner_node
 from src.agents.researcher import researcher_node
 from src.agents.reviewer import reviewer_node
@@ -18,6 +21,25 @@ def should_continue(state: ResearchState):
     print("--- [Graph] Decision: Generate Report ---")
     return "reporter"
 
+def build_initial_state(task: str, max_loops: int = 3, max_results: Optional[int] = None,
+                        deadline: Optional[float] = None, run_id: Optional[str] = None) -> ResearchState:
+    """
+    构建一次研究任务的初始状态
+    """
+    return {
+        "task": task,
+        "sub_queries": [],
+        "notes": [],
+        "report_content": "",
+        "review_count": 0,
+        "max_loops": max_loops,
+        "feedback": None,
+        "max_results": max_results or settings.SEARCH_MAX_RESULTS,
+        "deadline": deadline,
+        "deadline_reached": False,
+        "run_id": run_id or uuid.uuid4().hex
+    }
+
 def create_graph():
     """
     构建 LangGraph 工作流
@@ -56,3 +78,16 @@ def create_graph():
     # 3. 编译图
     app = workflow.compile()
     return app
+
+
+# 编译后的图不保存状态，可在所有请求间共享
+_compiled_graph = None
+
+def get_graph():
+    """
+    获取共享的已编译图 (首次调用时编译)
+    """
+    global _compiled_graph
+    if _compiled_graph is None:
+        _compiled_graph = create_graph()
+    return _compiled_graph
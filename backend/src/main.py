@@ -1,23 +1,81 @@
 import json
+import gzip
+import time
 import asyncio
 import uuid
-from typing import List, Optional, Dict
+import contextlib
+from typing import List, Optional, Dict, Literal, Set
 from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, Request, Depends, HTTPException
+from pathlib import Path
+from fastapi import FastAPI, Request, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select, col
 
-from src.graph import create_graph
-from src.database import create_db_and_tables, engine, get_session
-from src.db_models import ResearchSession
+from src.graph import get_graph, build_initial_state
+from src.database import create_db_and_tables, get_session, save_research_session
+from src.db_models import ResearchSession, ResearchExport
+from src.exports import build_export, EXPORT_CSP
+from src.batch import BatchRunner, load_tasks
+from src.agents.researcher import cancel_run_speculative, notes_cache_scope
+from src.core.metrics import metrics, usage_tokens
+from src.core.warmup import warmup
+from src.core.budget import plan_degradation
+from src.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional: br is only offered when brotli is installed
+    brotli = None
+
+# Startup results reported by /ready
+startup_state: Dict[str, object] = {"ready": False, "checks": {}, "startup_seconds": None, "warmup_attempts": 0}
+
+# Backoff between warmup retries while the service is not ready (seconds)
+WARMUP_RETRY_INITIAL = 5.0
+WARMUP_RETRY_MAX = 300.0
+
+async def _run_warmup():
+    start = time.perf_counter()
+    checks = await warmup()
+    metrics.observe("warmup_seconds", time.perf_counter() - start)
+    startup_state["checks"] = checks
+    startup_state["ready"] = all(status == "ok" for status in checks.values())
+    startup_state["warmup_attempts"] += 1
+
+async def _retry_warmup():
+    """Keep retrying warmup in the background so the service recovers once configuration or network is fixed"""
+    delay = WARMUP_RETRY_INITIAL
+    while not startup_state["ready"]:
+        await asyncio.sleep(delay)
+        await _run_warmup()
+        delay = min(delay * 2, WARMUP_RETRY_MAX)
+    print(f"--- [Main] Ready after {startup_state['warmup_attempts']} warmup attempts ---")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    start = time.perf_counter()
     create_db_and_tables()
+
+    # Compile the graph once; every request shares it
+    compile_start = time.perf_counter()
+    get_graph()
+    metrics.observe("graph_compile_seconds", time.perf_counter() - compile_start)
+
+    await _run_warmup()
+    startup_state["startup_seconds"] = round(time.perf_counter() - start, 3)
+    metrics.observe("startup_seconds", startup_state["startup_seconds"])
+    print(f"--- [Main] Startup finished in {startup_state['startup_seconds']}s, checks: {startup_state['checks']} ---")
+
+    retry_task = None if startup_state["ready"] else asyncio.create_task(_retry_warmup())
     yield
+    if retry_task:
+        retry_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await retry_task
 
 app = FastAPI(title="Self-DeepResearch API", lifespan=lifespan)
 
@@ -32,6 +90,13 @@ app.add_middleware(
 class ResearchRequest(BaseModel):
     task: str = Field(..., min_length=5, max_length=300, description="Research task description")
     max_loops: int = Field(3, ge=1, le=5, description="Max research loops (depth)")
+    deadline_seconds: Optional[float] = Field(None, ge=30, description="Time budget for the run (capped by the server default)")
+
+class BatchRequest(BaseModel):
+    input_path: str = Field(..., description="JSONL file with one task per line, relative to BATCH_DIR")
+    output_path: str = Field(..., description="Output JSONL relative to BATCH_DIR, also used to resume the batch")
+    concurrency: int = Field(2, ge=1, le=10, description="Number of tasks to run in parallel")
+    save_to_db: bool = Field(True, description="Save each report to the history database")
 
 class HistorySummary(BaseModel):
     """Lightweight history item for list view"""
@@ -43,12 +108,68 @@ class HistorySummary(BaseModel):
     class Config:
         from_attributes = True
 
+# Saved-report responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+EXPORT_MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
 # Global semaphore for concurrency control
 MAX_CONCURRENT_RESEARCH = 2
 research_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RESEARCH)
 
-# Track active research tasks for cancellation
-active_tasks: Dict[str, asyncio.Event] = {}
+# How often to poll for a disconnected client (seconds)
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class ActiveRun:
+    """Bookkeeping for one research run so it can be cancelled from outside"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.cancel_event = asyncio.Event()
+        self.graph_task: Optional[asyncio.Task] = None
+        self.cancel_reason: Optional[str] = None
+        self.cancel_requested_at: Optional[float] = None
+        self.tokens_used = 0
+        # Streamed chunks of LLM calls that have not finished yet (≈ output tokens)
+        self.inflight_tokens: Dict[str, int] = {}
+
+    def cancel(self, reason: str):
+        """Stop the run: abort the running graph task (and its HTTP calls) right away"""
+        if self.cancel_event.is_set():
+            return
+        self.cancel_reason = reason
+        self.cancel_requested_at = time.monotonic()
+        self.cancel_event.set()
+        if self.graph_task and not self.graph_task.done():
+            self.graph_task.cancel()
+
+    def record_event(self, event: dict):
+        """Track token usage from graph events for wasted-token accounting"""
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            run_id = event.get("run_id", "")
+            self.inflight_tokens[run_id] = self.inflight_tokens.get(run_id, 0) + 1
+        elif kind == "on_chat_model_end":
+            streamed = self.inflight_tokens.pop(event.get("run_id", ""), 0)
+            tokens = usage_tokens(event["data"].get("output"))
+            self.tokens_used += tokens if tokens is not None else streamed
+
+    @property
+    def wasted_tokens(self) -> int:
+        return self.tokens_used + sum(self.inflight_tokens.values())
+
+
+# Track active research runs for cancellation
+active_tasks: Dict[str, ActiveRun] = {}
+
+# Batch jobs started through the API; finished ones are kept for progress queries up to a limit
+MAX_FINISHED_BATCH_JOBS = 20
+batch_jobs: Dict[str, BatchRunner] = {}
+batch_tasks: Dict[str, asyncio.Task] = {}
 
 # Queue tracking for position info
 waiting_queue: List[str] = []
@@ -82,6 +203,93 @@ def get_friendly_error(error: Exception) -> str:
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: the graph is compiled and the LLM/search clients are warmed up (retried in the background)"""
+    status_code = 200 if startup_state["ready"] else 503
+    return JSONResponse(status_code=status_code, content={
+        "status": "ready" if startup_state["ready"] else "not_ready",
+        "checks": startup_state["checks"],
+        "startup_seconds": startup_state["startup_seconds"],
+        "warmup_attempts": startup_state["warmup_attempts"],
+    })
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+@contextlib.asynccontextmanager
+async def _batch_slot(task_id: str):
+    """Run a batch task in a shared research slot, queued (and counted for degradation) like streamed runs"""
+    if research_semaphore.locked():
+        entry = f"batch:{task_id}"
+        waiting_queue.append(entry)
+        try:
+            await research_semaphore.acquire()
+        finally:
+            waiting_queue.remove(entry)
+    else:
+        await research_semaphore.acquire()
+    try:
+        yield
+    finally:
+        research_semaphore.release()
+
+def _prune_batch_jobs():
+    """Forget the oldest finished batch jobs beyond MAX_FINISHED_BATCH_JOBS"""
+    finished = sorted(
+        (batch_id for batch_id in batch_jobs if batch_id not in batch_tasks),
+        key=lambda batch_id: batch_jobs[batch_id].finished_at or 0.0,
+    )
+    for batch_id in finished[:max(0, len(finished) - MAX_FINISHED_BATCH_JOBS)]:
+        del batch_jobs[batch_id]
+
+async def _run_batch_job(batch_id: str, runner: BatchRunner):
+    try:
+        await runner.run()
+    except Exception as e:
+        print(f"Batch {batch_id} failed: {e}")
+    finally:
+        batch_tasks.pop(batch_id, None)
+        _prune_batch_jobs()
+
+def _batch_path(name: str) -> Path:
+    """Resolve a client-supplied batch file name inside BATCH_DIR"""
+    relative = Path(name)
+    if not name or relative.is_absolute() or ".." in relative.parts:
+        raise HTTPException(status_code=400, detail=f"Invalid batch file name: {name!r}")
+    base = Path(settings.BATCH_DIR).resolve()
+    path = (base / relative).resolve()
+    # Symlinks must not lead out of the batch directory either
+    if not path.is_relative_to(base):
+        raise HTTPException(status_code=400, detail=f"Invalid batch file name: {name!r}")
+    return path
+
+@app.post("/batch")
+async def start_batch(request: BatchRequest):
+    """Start a batch of research tasks from a JSONL file in the background"""
+    input_path = _batch_path(request.input_path)
+    output_path = _batch_path(request.output_path)
+    try:
+        load_tasks(str(input_path))
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    batch_id = str(uuid.uuid4())
+    runner = BatchRunner(str(input_path), str(output_path), request.concurrency, request.save_to_db, slot=_batch_slot)
+    batch_jobs[batch_id] = runner
+    batch_tasks[batch_id] = asyncio.create_task(_run_batch_job(batch_id, runner))
+    return {"batch_id": batch_id, "status": "started"}
+
+@app.get("/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """Progress and throughput of a batch job"""
+    runner = batch_jobs.get(batch_id)
+    if not runner:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return runner.progress()
+
 @app.get("/history", response_model=List[HistorySummary])
 async def get_history(session: Session = Depends(get_session)):
     """Get history list with summary only (no full report content)"""
@@ -98,18 +306,133 @@ async def get_history(session: Session = Depends(get_session)):
         ))
     return summaries
 
+def _etag_matches(http_request: Request, etag: str) -> bool:
+    """Weak comparison of If-None-Match against our ETag"""
+    header = http_request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
+
+def _accepted_encodings(header: str) -> Set[str]:
+    """Content codings the client accepts; "q=0" explicitly refuses one"""
+    accepted: Set[str] = set()
+    for token in header.lower().split(","):
+        coding, *params = [part.strip() for part in token.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+def _cached_response(
+    http_request: Request,
+    body: bytes,
+    etag: str,
+    media_type: str,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Conditional, compressed response for immutable saved-report content"""
+    if _etag_matches(http_request, etag):
+        return _not_modified(etag)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding", **(extra_headers or {})}
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        accepted = _accepted_encodings(http_request.headers.get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def _stored_etag(session: Session, session_id: int) -> Optional[str]:
+    """ETag of a saved export, without loading the rendered documents"""
+    return session.exec(select(ResearchExport.etag).where(ResearchExport.session_id == session_id)).first()
+
+def _get_export(session: Session, item: ResearchSession) -> ResearchExport:
+    """Pre-rendered export of a session; older sessions are rendered once on first access"""
+    export = session.get(ResearchExport, item.id)
+    if export is None:
+        export = build_export(item)
+        session.add(export)
+        session.commit()
+        session.refresh(export)
+    return export
+
 @app.get("/history/{session_id}", response_model=ResearchSession)
-async def get_history_item(session_id: int, session: Session = Depends(get_session)):
+async def get_history_item(
+    session_id: int,
+    http_request: Request,
+    part: Literal["all", "report", "notes"] = "all",
+    session: Session = Depends(get_session),
+):
+    """Get a saved session, or only its report or notes, with ETag revalidation"""
+    # Reports never change after saving, so a matching ETag skips loading the session
+    if "if-none-match" in http_request.headers:
+        etag = _stored_etag(session, session_id)
+        if etag and _etag_matches(http_request, f'W/"{etag}-{part}"'):
+            return _not_modified(f'W/"{etag}-{part}"')
+
     item = session.get(ResearchSession, session_id)
     if not item:
         raise HTTPException(status_code=404, detail="Session not found")
-    return item
+
+    if part == "report":
+        payload = {"id": item.id, "task": item.task, "created_at": item.created_at, "report_content": item.report_content}
+    elif part == "notes":
+        payload = {"id": item.id, "notes": item.notes}
+    else:
+        payload = item
+    body = json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8")
+    export = _get_export(session, item)
+    return _cached_response(http_request, body, f'W/"{export.etag}-{part}"', "application/json")
+
+@app.get("/history/{session_id}/export")
+async def export_history_item(
+    session_id: int,
+    http_request: Request,
+    fmt: Literal["markdown", "html"] = Query("markdown", alias="format"),
+    session: Session = Depends(get_session),
+):
+    """Download the pre-rendered report with resolved citations"""
+    if "if-none-match" in http_request.headers:
+        etag = _stored_etag(session, session_id)
+        if etag and _etag_matches(http_request, f'W/"{etag}-{fmt}"'):
+            return _not_modified(f'W/"{etag}-{fmt}"')
+
+    export = session.get(ResearchExport, session_id)
+    if export is None:
+        item = session.get(ResearchSession, session_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Session not found")
+        export = _get_export(session, item)
+
+    body = export.markdown if fmt == "markdown" else export.html
+    # The report comes from LLM output and web pages: never let the browser run scripts from it
+    headers = {"Content-Security-Policy": EXPORT_CSP, "X-Content-Type-Options": "nosniff"} if fmt == "html" else None
+    return _cached_response(http_request, body.encode("utf-8"), f'W/"{export.etag}-{fmt}"', EXPORT_MEDIA_TYPES[fmt], headers)
 
 @app.delete("/history/{session_id}")
 async def delete_history_item(session_id: int, session: Session = Depends(get_session)):
     item = session.get(ResearchSession, session_id)
     if not item:
         raise HTTPException(status_code=404, detail="Session not found")
+    export = session.get(ResearchExport, session_id)
+    if export:
+        session.delete(export)
     session.delete(item)
     session.commit()
     return {"status": "deleted"}
@@ -117,16 +440,71 @@ async def delete_history_item(session_id: int, session: Session = Depends(get_se
 @app.post("/research/{session_id}/cancel")
 async def cancel_research(session_id: str):
     """Cancel an ongoing research task"""
-    if session_id in active_tasks:
-        active_tasks[session_id].set()
+    run = active_tasks.get(session_id)
+    if run:
+        run.cancel("user")
         return {"status": "cancelling"}
     return {"status": "not_found"}
 
+
+async def _watch_disconnect(http_request: Request, run: ActiveRun):
+    """Treat a disconnected client as a cancellation"""
+    while not run.cancel_event.is_set():
+        if await http_request.is_disconnected():
+            print(f"--- [Main] Client disconnected, cancelling {run.session_id} ---")
+            run.cancel("disconnect")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+def _cancel_on_server_disconnect(run: ActiveRun):
+    """The server stopped the stream (client gone) before the watcher noticed: count it as a disconnect"""
+    if not run.cancel_event.is_set():
+        print(f"--- [Main] Stream closed by server, cancelling {run.session_id} ---")
+        run.cancel("disconnect")
+
+
+async def _acquire_slot(run: ActiveRun) -> bool:
+    """Wait for a research slot. Returns False if the run is cancelled while queued"""
+    acquire = asyncio.ensure_future(research_semaphore.acquire())
+    cancelled = asyncio.ensure_future(run.cancel_event.wait())
+    try:
+        await asyncio.wait({acquire, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        if acquire.done() and not acquire.cancelled():
+            research_semaphore.release()
+        else:
+            acquire.cancel()
+        raise
+    finally:
+        cancelled.cancel()
+
+    if acquire.done():
+        return True
+    acquire.cancel()
+    return False
+
+
+def _release_run(run: ActiveRun, acquired: bool):
+    """Free the research slot and report cancellation metrics"""
+    if acquired:
+        research_semaphore.release()
+    active_tasks.pop(run.session_id, None)
+
+    if run.cancel_requested_at is not None:
+        release_latency = time.monotonic() - run.cancel_requested_at
+        metrics.incr(f"research_cancelled_total.{run.cancel_reason}")
+        metrics.incr("wasted_tokens_total", run.wasted_tokens)
+        metrics.observe("cancel_to_release_seconds", release_latency)
+        print(f"--- [Main] Run {run.session_id} cancelled ({run.cancel_reason}): "
+              f"slot released in {release_latency:.3f}s, wasted ~{run.wasted_tokens} tokens ---")
+
+
 @app.post("/research/stream")
-async def stream_research(request: ResearchRequest):
+async def stream_research(request: ResearchRequest, http_request: Request):
     session_id = str(uuid.uuid4())
-    cancel_event = asyncio.Event()
-    active_tasks[session_id] = cancel_event
+    run = ActiveRun(session_id)
+    active_tasks[session_id] = run
 
     # Check queue position
     queue_position = len(waiting_queue)
@@ -140,55 +518,91 @@ async def stream_research(request: ResearchRequest):
         queue_position = len(waiting_queue)
 
         async def queued_generator():
+            acquired = False
+            watcher = asyncio.create_task(_watch_disconnect(http_request, run))
             try:
                 # Notify client about queue position
                 yield f"data: {json.dumps({'type': 'queued', 'position': queue_position, 'session_id': session_id})}\n\n"
 
-                # Wait for semaphore
-                await research_semaphore.acquire()
+                # Wait for semaphore (or cancellation while queued)
+                acquired = await _acquire_slot(run)
                 waiting_queue.remove(session_id)
 
                 # Check if cancelled while waiting
-                if cancel_event.is_set():
-                    yield f"data: {json.dumps({'type': 'cancelled'})}\n\n"
+                if run.cancel_event.is_set():
+                    yield f"data: {json.dumps({'type': 'cancelled', 'wasted_tokens': 0})}\n\n"
                     return
 
                 # Continue with normal flow
-                async for event in _run_research(request, session_id, cancel_event):
+                async for event in _run_research(request, run):
                     yield event
+            except (asyncio.CancelledError, GeneratorExit):
+                _cancel_on_server_disconnect(run)
+                raise
             finally:
+                watcher.cancel()
                 if session_id in waiting_queue:
                     waiting_queue.remove(session_id)
-                research_semaphore.release()
-                if session_id in active_tasks:
-                    del active_tasks[session_id]
+                _release_run(run, acquired)
 
         return StreamingResponse(queued_generator(), media_type="text/event-stream")
 
     async def event_generator():
+        watcher = asyncio.create_task(_watch_disconnect(http_request, run))
         try:
-            async for event in _run_research(request, session_id, cancel_event):
+            async for event in _run_research(request, run):
                 yield event
+        except (asyncio.CancelledError, GeneratorExit):
+            _cancel_on_server_disconnect(run)
+            raise
         finally:
-            research_semaphore.release()
-            if session_id in active_tasks:
-                del active_tasks[session_id]
+            watcher.cancel()
+            _release_run(run, True)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
-async def _run_research(request: ResearchRequest, session_id: str, cancel_event: asyncio.Event):
+# Marks the end of the graph event stream in the pump queue
+_GRAPH_DONE = object()
+
+
+async def _pump_graph_events(graph, initial_state: dict, queue: asyncio.Queue):
+    """
+    Run the graph in its own task so that cancelling it reaches the in-flight
+    LLM streams and searches instead of waiting for the next event
+    """
+    try:
+        async for event in graph.astream_events(initial_state, version="v1"):
+            queue.put_nowait(event)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        queue.put_nowait(e)
+
+
+async def _stop_graph_task(run: ActiveRun):
+    """Cancel the graph task if it is still running and wait for it to unwind"""
+    task = run.graph_task
+    if task is None or task.done():
+        return
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+async def _run_research(request: ResearchRequest, run: ActiveRun):
     """Core research logic with streaming events"""
-    graph = create_graph()
-    initial_state = {
-        "task": request.task,
-        "sub_queries": [],
-        "notes": [],
-        "report_content": "",
-        "review_count": 0,
-        "max_loops": request.max_loops,
-        "feedback": None
-    }
+    session_id = run.session_id
+    setup_start = time.perf_counter()
+    graph = get_graph()
+
+    # Under load, shrink the run so queued users are not stuck behind full-depth runs
+    queue_depth = len(waiting_queue)
+    plan = plan_degradation(request.max_loops, settings.SEARCH_MAX_RESULTS, queue_depth)
+    max_loops = plan["max_loops"]
+    budget_seconds = min(request.deadline_seconds or settings.RUN_DEADLINE_SECONDS, settings.RUN_DEADLINE_SECONDS)
+    deadline = time.time() + budget_seconds
+    initial_state = build_initial_state(request.task, max_loops, plan["max_results"], deadline, session_id)
 
     sent_notes_count = 0
     full_report_content = ""
@@ -197,23 +611,61 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
     current_phase = "planner"
 
     # Send session ID to client
-    yield f"data: {json.dumps({'type': 'session_start', 'session_id': session_id})}\n\n"
+    yield f"data: {json.dumps({'type': 'session_start', 'session_id': session_id, 'deadline_seconds': budget_seconds})}\n\n"
+
+    if plan["degraded"]:
+        metrics.incr("degraded_runs_total.load")
+        print(f"--- [Main] Queue depth {queue_depth}: max_loops {request.max_loops} -> {max_loops}, max_results -> {plan['max_results']} ---")
+        yield f"data: {json.dumps({'type': 'degraded', 'reason': 'load', 'queue_depth': queue_depth, 'max_loops': max_loops, 'max_results': plan['max_results']})}\n\n"
+    deadline_reported = False
+
+    # Cancelled while the client was receiving the first events
+    if run.cancel_event.is_set():
+        yield f"data: {json.dumps({'type': 'cancelled', 'wasted_tokens': 0})}\n\n"
+        return
+
+    event_queue: asyncio.Queue = asyncio.Queue()
+    # The graph task gets its own notes cache, dropped with the run
+    with notes_cache_scope():
+        run.graph_task = asyncio.create_task(_pump_graph_events(graph, initial_state, event_queue))
+    # Queued from a callback so the stream ends even if the task is cancelled before it starts
+    run.graph_task.add_done_callback(lambda _: event_queue.put_nowait(_GRAPH_DONE))
+    metrics.observe("request_setup_seconds", time.perf_counter() - setup_start)
 
     try:
-        async for event in graph.astream_events(initial_state, version="v1"):
+        while True:
+            event = await event_queue.get()
+
             # Check for cancellation
-            if cancel_event.is_set():
-                yield f"data: {json.dumps({'type': 'cancelled'})}\n\n"
+            if run.cancel_event.is_set():
+                yield f"data: {json.dumps({'type': 'cancelled', 'wasted_tokens': run.wasted_tokens})}\n\n"
                 return
 
+            if event is _GRAPH_DONE:
+                break
+            if isinstance(event, Exception):
+                raise event
+
+            run.record_event(event)
+
             kind = event["event"]
             name = event["name"]
             data = event["data"]
 
+            # A node cut its work short because the deadline is close. The reporter
+            # trimming its notes is reported too, even if an earlier phase already was
+            if kind == "on_chain_end" and name in ("planner", "researcher", "reviewer", "reporter"):
+                output = data.get("output")
+                if isinstance(output, dict) and output.get("deadline_reached") and (not deadline_reported or name == "reporter"):
+                    if not deadline_reported:
+                        metrics.incr("degraded_runs_total.deadline")
+                    deadline_reported = True
+                    yield f"data: {json.dumps({'type': 'degraded', 'reason': 'deadline', 'phase': name})}\n\n"
+
             # --- 1. Planner ---
             if kind == "on_chain_start" and name == "planner":
                 current_phase = "planner"
-                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop, 'max_loops': request.max_loops, 'phase': 'planner', 'message': 'Planning research strategy...'})}\n\n"
+                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop, 'max_loops': max_loops, 'phase': 'planner', 'message': 'Planning research strategy...'})}\n\n"
 
             if kind == "on_chain_end" and name == "planner":
                 output = data.get("output")
@@ -223,7 +675,7 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
             # --- 2. Researcher ---
             if kind == "on_chain_start" and name == "researcher":
                 current_phase = "researcher"
-                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': request.max_loops, 'phase': 'researcher', 'message': 'Searching and analyzing information...'})}\n\n"
+                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': max_loops, 'phase': 'researcher', 'message': 'Searching and analyzing information...'})}\n\n"
 
             if kind == "on_chain_end" and name == "researcher":
                 output = data.get("output")
@@ -242,7 +694,7 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
             # --- 3. Reviewer ---
             if kind == "on_chain_start" and name == "reviewer":
                 current_phase = "reviewer"
-                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': request.max_loops, 'phase': 'reviewer', 'message': 'Reviewing research quality...'})}\n\n"
+                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': max_loops, 'phase': 'reviewer', 'message': 'Reviewing research quality...'})}\n\n"
 
             # Capture streaming reviewer chunks
             if kind == "on_chat_model_stream" and "reviewer" in event.get("tags", []):
@@ -264,7 +716,7 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
             # --- 4. Reporter ---
             if kind == "on_chain_start" and name == "reporter":
                 current_phase = "reporter"
-                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': request.max_loops, 'phase': 'reporter', 'message': 'Writing final report...'})}\n\n"
+                yield f"data: {json.dumps({'type': 'progress', 'current_loop': current_loop + 1, 'max_loops': max_loops, 'phase': 'reporter', 'message': 'Writing final report...'})}\n\n"
 
             # Capture streaming report chunks
             if kind == "on_chat_model_stream" and "reporter" in event.get("tags", []):
@@ -278,17 +730,9 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
         # --- Save to DB ---
         if full_report_content:
             try:
-                with Session(engine) as session:
-                    db_session = ResearchSession(
-                        task=request.task,
-                        report_content=full_report_content,
-                        notes_json=json.dumps(accumulated_notes)
-                    )
-                    session.add(db_session)
-                    session.commit()
-                    session.refresh(db_session)
-                    # Yield the saved ID so frontend can update URL or state
-                    yield f"data: {json.dumps({'type': 'saved', 'id': db_session.id})}\n\n"
+                saved_id = save_research_session(request.task, full_report_content, accumulated_notes)
+                # Yield the saved ID so frontend can update URL or state
+                yield f"data: {json.dumps({'type': 'saved', 'id': saved_id})}\n\n"
             except Exception as e:
                 print(f"Error saving to DB: {e}")
                 # Don't fail the stream just because save failed, but log it
@@ -299,3 +743,7 @@ async def _run_research(request: ResearchRequest, session_id: str, cancel_event:
         print(f"Stream Error: {e}")
         friendly_error = get_friendly_error(e)
         yield f"data: {json.dumps({'type': 'error', 'content': friendly_error})}\n\n"
+    finally:
+        await _stop_graph_task(run)
+        # Speculative searches are separate tasks: stop those started for queries the researcher never reached
+        cancel_run_speculative(session_id)
@@ -21,3 +21,7 @@ class ResearchState(TypedDict):
     review_count: int           # 反思循环计数器 (防死循环)
     max_loops: int              # 最大反思循环次数 (默认3)
     feedback: Optional[str]     # Reviewer 的反馈意见
+    max_results: int            # 每个查询的搜索结果数
+    deadline: Optional[float]   # 截止时间 (Unix 时间戳)，None 表示不限时
+    deadline_reached: bool      # 是否因临近截止时间而提前结束研究
+    run_id: str                 # 本次运行的唯一 ID (区分并发运行的推测查询)
@@ -1,3 +1,6 @@
+# 提示词按"静态指令 -> 会话上下文 -> 单次调用内容"的顺序组织：
+# 系统提示词不含任何变量，同一会话内的调用共享字节一致的前缀，便于服务端 Prompt 缓存命中。
+
 PLANNER_PROMPT = """你是一个专业的深度研究规划师。
 你的任务是将用户的研究主题拆解为 3-5 个具体的、适合搜索引擎查询的子问题 (Sub-queries)。
 
@@ -5,77 +8,37 @@ PLANNER_PROMPT = """你是一个专业的深度研究规划师。
 1. 子问题必须具体、明确，避免宽泛的词汇。
 2. 子问题应涵盖研究主题的不同维度（如背景、现状、挑战、解决方案等）。
 3. 必须输出为 JSON 格式，包含一个 "queries" 字段，值为字符串列表。
-
-用户主题:
-<user_topic>
-{task}
-</user_topic>
 """
 
 RESEARCHER_PROMPT = """你是一个敏锐的研究员。
-你的任务是阅读搜索结果，并提取与用户任务最相关的信息。
-
-用户任务:
-<user_task>
-{task}
-</user_task>
-
-当前搜索查询:
-<query>
-{query}
-</query>
-
-请基于以下搜索结果，提取关键信息生成一条笔记 (Note)。
-搜索结果:
-<search_results>
-{content}
-</search_results>
+你的任务是阅读搜索得到的网页段落，并提取与用户任务最相关的信息，生成一条笔记 (Note)。
+每个段落以 [P编号] 开头，并附有来源标题和链接。
 
 要求：
 1. 笔记内容要精炼但信息量大。
-2. 如果搜索结果与任务无关，请忽略。
-3. 必须包含来源信息。
+2. 如果段落与任务无关，请忽略。
+3. 每条要点单独成行，并在行末用 [P编号] 标注所依据的段落，例如 [P2]。
 """
 
 REVIEWER_PROMPT = """你是一个严格的研究审阅者 (Reviewer)。
 你的任务是评估现有的研究笔记是否足以回答用户的原始问题。
 
-用户原始问题:
-<user_task>
-{task}
-</user_task>
-
-当前已有的研究笔记 (Notes):
-<notes>
-{notes}
-</notes>
-
 请思考：
 1. 现有信息是否全面？是否有关键视角缺失？
 2. 是否存在相互矛盾的信息需要进一步查证？
 3. 信息是否已经过时？
 
 决策输出 (JSON):
-{{
+{
     "satisfactory": boolean,  // 如果信息足够写出高质量报告，为 true；否则为 false
     "feedback": string,       // 评审意见，说明缺口在哪里
     "new_queries": [string]   // 如果不满意，提供 1-3 个新的搜索查询来填补缺口。如果满意，留空。
-}}
+}
 """
 
 REPORTER_PROMPT = """你是一个专业的报告撰写人。
 你的任务是基于提供的研究笔记，撰写一份结构清晰、深度详实的 Markdown 报告。
 
-用户主题:
-<user_topic>
-{task}
-</user_topic>
-
-研究笔记:
-<notes>
-{notes}
-</notes>
-
 要求：
 1. 报告结构应包含：标题、摘要、正文（分章节）、结论。
 2. 使用 Markdown 格式。
@@ -83,3 +46,39 @@ REPORTER_PROMPT = """你是一个专业的报告撰写人。
 4. 不要在报告末尾列出参考文献，系统会根据引用自动生成参考文献列表。
 5. 语言通顺，逻辑严密，不仅是笔记的堆砌，要有综合分析。
 """
+
+# 会话上下文：同一研究任务内保持不变
+TASK_CONTEXT = """用户任务:
+<user_task>
+{task}
+</user_task>
+"""
+
+# 单次调用内容：放在消息末尾
+PLANNER_INPUT = "请开始规划。"
+
+RESEARCHER_INPUT = """当前搜索查询:
+<query>
+{query}
+</query>
+
+网页段落:
+<search_results>
+{content}
+</search_results>
+
+请提取笔记。"""
+
+REVIEWER_INPUT = """当前已有的研究笔记 (Notes):
+<notes>
+{notes}
+</notes>
+
+请审查并给出决策。"""
+
+REPORTER_INPUT = """研究笔记:
+<notes>
+{notes}
+</notes>
+
+请撰写报告。"""
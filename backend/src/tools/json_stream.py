@@ -0,0 +1,72 @@
+import json
+from typing import List, Dict, Any
+
+
+class StreamingArrayParser:
+    """
+    增量解析流式输出的 JSON 对象，顶层字段 key 对应数组中的字符串一闭合即返回
+    例如 Reviewer 输出的 {"new_queries": ["a", "b"]}，收到 "a" 的结束引号时即可得到 "a"
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        输入一段流式文本，返回本段内新闭合的数组元素
+        """
+        completed: List[str] = []
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string("".join(self._buf), completed)
+                else:
+                    self._buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch == "{":
+                self._stack.append({"type": "object", "key": None, "expect_key": True})
+            elif ch == "[":
+                self._stack.append({"type": "array"})
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+            elif ch == ":":
+                if self._stack and self._stack[-1]["type"] == "object":
+                    self._stack[-1]["expect_key"] = False
+            elif ch == ",":
+                if self._stack and self._stack[-1]["type"] == "object":
+                    self._stack[-1]["expect_key"] = True
+        return completed
+
+    def _on_string(self, raw: str, completed: List[str]):
+        try:
+            value = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            value = raw
+        if not self._stack:
+            return
+
+        top = self._stack[-1]
+        if top["type"] == "object":
+            if top["expect_key"]:
+                top["key"] = value
+            return
+
+        # 仅处理顶层对象中目标字段的数组元素
+        if len(self._stack) == 2 and self._stack[0]["type"] == "object" and self._stack[0]["key"] == self.key:
+            completed.append(value)
@@ -0,0 +1,206 @@
+import re
+import math
+from collections import Counter
+from html.parser import HTMLParser
+from typing import List, Dict, Any
+from pydantic import BaseModel, Field
+
+# 拉丁字母/数字按词切分，中文连续片段按二元组切分
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+_SENTENCE_PATTERN = re.compile(r"(?<=[。！？!?.;；])\s*")
+_HTML_PATTERN = re.compile(r"<(html|body|div|p|article)[\s>]", re.IGNORECASE)
+
+# 与查询相关 (BM25 得分大于 0) 的段落少于此数时，用摘要片段和原文段落补足 token 预算
+MIN_RELEVANT_PASSAGES = 3
+
+
+class Passage(BaseModel):
+    """
+    网页中的一个段落，保留来源信息用于笔记溯源
+    """
+    text: str
+    url: str
+    title: str
+    score: float = Field(0.0, description="与查询的 BM25 相关度")
+
+
+class _TextExtractor(HTMLParser):
+    SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg"}
+    BLOCK_TAGS = {"p", "div", "section", "article", "li", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    将 HTML 转为纯文本，去掉脚本、样式和导航等噪声，保留段落边界
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = "".join(parser.parts)
+    paragraphs = [re.sub(r"[ \t\r\f\v]+", " ", p).strip() for p in re.split(r"\n\s*\n", text)]
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.findall(text.lower()):
+        if match[0].isascii():
+            tokens.append(match)
+        elif len(match) == 1:
+            tokens.append(match)
+        else:
+            tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 LLM token 数：中文约 1 字 1 token，英文约 1 词 1.3 token
+    """
+    cjk = len(re.findall(r"[\u4e00-\u9fff]", text))
+    words = len(re.findall(r"[A-Za-z0-9]+", text))
+    return cjk + int(words * 1.3) + 1
+
+
+def split_passages(text: str, max_tokens: int = 200, min_tokens: int = 12) -> List[str]:
+    """
+    按段落切分正文，短段落合并、长段落按句子拆分，使每段约 max_tokens
+    过短的段落 (导航、按钮文字等) 会被丢弃
+    """
+    units: List[str] = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+        else:
+            units.extend(s.strip() for s in _SENTENCE_PATTERN.split(paragraph) if s.strip())
+
+    passages: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        passages.append(" ".join(current))
+
+    return [p for p in passages if estimate_tokens(p) >= min_tokens]
+
+
+class BM25Index:
+    """
+    本地 BM25 索引，对单次搜索返回的段落排序
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(doc)) for doc in documents]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if self.doc_lens else 0.0
+        self.doc_freq: Counter = Counter()
+        for tf in self.term_freqs:
+            self.doc_freq.update(tf.keys())
+
+    def idf(self, term: str) -> float:
+        n = len(self.term_freqs)
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        results = []
+        for tf, doc_len in zip(self.term_freqs, self.doc_lens):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_len) if self.avg_len else self.k1
+            for term in query_terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf(term) * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+
+def select_passages(query: str, results: List[Dict[str, Any]], token_budget: int = 2000) -> List[Passage]:
+    """
+    将搜索结果切分为段落，按与查询的 BM25 相关度排序，
+    在 token 预算内返回得分最高的段落 (按得分降序)
+    查询与网页没有共同词 (如中文查询命中英文网页) 时得分全为 0，
+    此时按 Tavily 摘要片段、原文段落的顺序补足预算，而不是只返回一个段落
+    """
+    candidates: List[Passage] = []
+    snippets: List[Passage] = []
+    seen = set()
+    for res in results:
+        url = res.get("url", "")
+        title = res.get("title") or "Unknown Source"
+        # Tavily 的摘要片段本身就是高相关内容，与原文段落一起参与排序 (不做最短长度过滤)
+        texts = [(res.get("content") or "", 1, True)]
+        raw = res.get("raw_content") or ""
+        if raw:
+            texts.append((html_to_text(raw) if _HTML_PATTERN.search(raw) else raw, 12, False))
+        for text, min_tokens, is_snippet in texts:
+            for chunk in split_passages(text, min_tokens=min_tokens):
+                if chunk not in seen:
+                    seen.add(chunk)
+                    passage = Passage(text=chunk, url=url, title=title)
+                    candidates.append(passage)
+                    if is_snippet:
+                        snippets.append(passage)
+
+    if not candidates:
+        return []
+
+    scores = BM25Index([p.text for p in candidates]).scores(query)
+    for passage, score in zip(candidates, scores):
+        passage.score = score
+    ranked = sorted(candidates, key=lambda p: p.score, reverse=True)
+
+    selected: List[Passage] = []
+    selected_ids = set()
+    used_tokens = 0
+
+    def take(passages: List[Passage]):
+        nonlocal used_tokens
+        for passage in passages:
+            tokens = estimate_tokens(passage.text)
+            if id(passage) in selected_ids or used_tokens + tokens > token_budget:
+                continue
+            selected.append(passage)
+            selected_ids.add(id(passage))
+            used_tokens += tokens
+
+    relevant = [p for p in ranked if p.score > 0]
+    take(relevant)
+    if len(relevant) < MIN_RELEVANT_PASSAGES:
+        # 得分为 0 的段落按摘要片段优先、其余按文档顺序追加
+        take(snippets)
+        take(candidates)
+    return selected
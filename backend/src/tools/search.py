@@ -1,35 +1,87 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import asyncio
 import hashlib
-from concurrent.futures import ThreadPoolExecutor
-from tavily import TavilyClient
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from tavily import TavilyClient, AsyncTavilyClient
 from src.core.config import settings
+from src.core.metrics import metrics
 
 class SearchTool:
-    def __init__(self):
-        if not settings.TAVILY_API_KEY:
-            raise ValueError("TAVILY_API_KEY is not set in environment variables")
-        self.client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-        self.executor = ThreadPoolExecutor(max_workers=5)
-        # Simple in-memory cache to avoid repeated searches
-        self._cache: Dict[str, List[Dict[str, Any]]] = {}
+    def __init__(self, max_workers: int = 5, cache_size: int = settings.SEARCH_CACHE_SIZE):
+        # Client and thread pool are created on first use, so importing this
+        # module is cheap and a missing key only fails when searching
+        self._client: Optional[TavilyClient] = None
+        self._async_client: Optional[AsyncTavilyClient] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        # In-memory LRU cache to avoid repeated searches; results carry full
+        # page content, so the number of cached queries is bounded
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._cache_size = cache_size
+
+    @property
+    def client(self) -> TavilyClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not settings.TAVILY_API_KEY:
+                        raise ValueError("TAVILY_API_KEY is not set in environment variables")
+                    self._client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncTavilyClient:
+        # httpx based: cancelling a search aborts its HTTP request
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    if not settings.TAVILY_API_KEY:
+                        raise ValueError("TAVILY_API_KEY is not set in environment variables")
+                    self._async_client = AsyncTavilyClient(api_key=settings.TAVILY_API_KEY)
+        return self._async_client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        return self._executor
+
+    def warmup(self, timeout: float = 5.0):
+        """
+        预先创建客户端，并启动同步搜索线程池中的全部工作线程
+        """
+        _ = self.client
+        _ = self.async_client
+        # 空任务会被同一个空闲线程依次执行；每个任务都阻塞到全部任务开始，
+        # 线程池只能为每个任务新建一个线程
+        barrier = threading.Barrier(self._max_workers)
+        futures = [self.executor.submit(barrier.wait, timeout) for _ in range(self._max_workers)]
+        wait(futures, timeout=timeout)
 
     def _get_cache_key(self, query: str, max_results: int) -> str:
         """Generate a cache key for the query"""
         return hashlib.md5(f"{query}:{max_results}".encode()).hexdigest()
 
+    def _search_params(self, query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "search_depth": "advanced",
+            "max_results": max_results,
+            "include_raw_content": True,
+            "include_answer": False,
+        }
+
     def search_sync(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
-        同步执行搜索
+        同步执行搜索 (供线程池或脚本中的同步调用方使用)
         """
         try:
-            response = self.client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=max_results,
-                include_raw_content=False,
-                include_answer=False
-            )
+            response = self.client.search(**self._search_params(query, max_results))
             return response.get("results", [])
         except Exception as e:
             print(f"Error during search: {e}")
@@ -37,25 +89,39 @@ class SearchTool:
 
     async def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
-        异步执行搜索 (运行在线程池中)，带缓存支持
+        异步执行搜索，带缓存支持；取消时会中止进行中的 HTTP 请求
         """
         cache_key = self._get_cache_key(query, max_results)
 
         # Check cache first
         if cache_key in self._cache:
             print(f"--- [Search] Cache hit for: {query} ---")
+            metrics.incr("search_cache_hits_total")
+            self._cache.move_to_end(cache_key)
             return self._cache[cache_key]
+        metrics.incr("search_cache_misses_total")
+
+        # Fail fast on missing configuration instead of returning empty results
+        client = self.async_client
 
-        loop = asyncio.get_running_loop()
-        results = await loop.run_in_executor(
-            self.executor,
-            self.search_sync,
-            query,
-            max_results
-        )
+        try:
+            response = await client.search(**self._search_params(query, max_results))
+            results = response.get("results", [])
+        except asyncio.CancelledError:
+            # 取消会关闭进行中的 HTTP 请求，结果不写入缓存
+            print(f"--- [Search] Cancelled: {query} ---")
+            metrics.incr("search_cancelled_total")
+            raise
+        except Exception as e:
+            print(f"Error during search: {e}")
+            return []
 
-        # Store in cache
+        # Store in cache, evicting the least recently used queries
         self._cache[cache_key] = results
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+            metrics.incr("search_cache_evictions_total")
         return results
 
     def clear_cache(self):
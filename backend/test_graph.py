@@ -1,29 +1,42 @@
+import time
+_import_start = time.perf_counter()
+
 import asyncio
 import os
 from dotenv import load_dotenv
-from src.graph import create_graph
+from src.graph import get_graph, build_initial_state
+from src.core.warmup import warmup
+
+import_seconds = time.perf_counter() - _import_start
 
 # 确保在测试前加载环境变量
 load_dotenv()
 
 async def main():
     print("Initializing Research Graph...")
-    app = create_graph()
+    start = time.perf_counter()
+    app = get_graph()
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    checks = await warmup()
+    warmup_seconds = time.perf_counter() - start
+
+    # 第二次获取即为每个请求的图准备开销
+    start = time.perf_counter()
+    get_graph()
+    build_initial_state("warmup")
+    setup_seconds = time.perf_counter() - start
     
     task = "分析 DeepSeek MoE 架构的核心优势"
     print(f"\nStarting research task: {task}\n")
     
-    initial_state = {
-        "task": task,
-        "sub_queries": [],
-        "notes": [],
-        "report_content": "",
-        "review_count": 0,
-        "feedback": None
-    }
+    initial_state = build_initial_state(task)
     
     # 使用 ainvoke 异步调用
+    start = time.perf_counter()
     result = await app.ainvoke(initial_state)
+    run_seconds = time.perf_counter() - start
     
     print("\n\n=== Final Report ===\n")
     print(result.get("report_content"))
@@ -32,5 +45,12 @@ async def main():
     print(f"Total Notes: {len(result.get('notes', []))}")
     print(f"Review Loops: {result.get('review_count')}")
 
+    print("\n=== Startup / Setup Overhead ===")
+    print(f"Module Import: {import_seconds:.3f}s")
+    print(f"Graph Compile (once): {compile_seconds:.3f}s")
+    print(f"Warmup: {warmup_seconds:.3f}s {checks}")
+    print(f"Per-request Setup: {setup_seconds * 1000:.3f}ms")
+    print(f"Research Run: {run_seconds:.1f}s")
+
 if __name__ == "__main__":
     asyncio.run(main())
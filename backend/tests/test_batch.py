@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import src.batch as batch
+import src.main as main
+from src.core.metrics import metrics
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main.settings, "BATCH_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_batch_path_resolves_inside_batch_dir(batch_dir):
+    assert main._batch_path("runs/tasks.jsonl") == batch_dir.resolve() / "runs" / "tasks.jsonl"
+
+
+@pytest.mark.parametrize("name", ["", "/etc/passwd", "../secret.jsonl", "runs/../../secret.jsonl"])
+def test_batch_path_rejects_escapes(batch_dir, name):
+    with pytest.raises(HTTPException) as exc:
+        main._batch_path(name)
+    assert exc.value.status_code == 400
+
+
+def test_batch_path_rejects_symlink_out_of_batch_dir(batch_dir, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    (batch_dir / "link").symlink_to(outside, target_is_directory=True)
+    with pytest.raises(HTTPException):
+        main._batch_path("link/tasks.jsonl")
+
+
+def _write_tasks(path, count):
+    path.write_text("".join(json.dumps({"task": f"research task {i}"}) + "\n" for i in range(count)), encoding="utf-8")
+
+
+class CacheHitGraph:
+    """Graph stub that records a search cache hit from a child task, like the researcher does"""
+
+    async def ainvoke(self, state):
+        async def search():
+            metrics.incr("search_cache_hits_total")
+
+        await asyncio.create_task(search())
+        return {"report_content": "", "notes": []}
+
+
+def test_batch_tasks_wait_in_the_shared_research_queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, "get_graph", lambda: CacheHitGraph())
+    _write_tasks(tmp_path / "tasks.jsonl", 1)
+    runner = batch.BatchRunner(str(tmp_path / "tasks.jsonl"), str(tmp_path / "out.jsonl"), save_to_db=False, slot=main._batch_slot)
+
+    async def scenario():
+        monkeypatch.setattr(main, "research_semaphore", asyncio.Semaphore(1))
+        await main.research_semaphore.acquire()
+        job = asyncio.create_task(runner.run())
+        await asyncio.sleep(0.05)
+        queued = list(main.waiting_queue)
+        main.research_semaphore.release()
+        await job
+        return queued
+
+    queued = asyncio.run(scenario())
+
+    assert len(queued) == 1 and queued[0].startswith("batch:")
+    assert main.waiting_queue == []
+    assert runner.progress()["completed"] == 1
+
+
+def test_batch_cache_hits_are_counted_per_runner(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, "get_graph", lambda: CacheHitGraph())
+    _write_tasks(tmp_path / "tasks.jsonl", 3)
+    first = batch.BatchRunner(str(tmp_path / "tasks.jsonl"), str(tmp_path / "first.jsonl"), save_to_db=False)
+    second = batch.BatchRunner(str(tmp_path / "tasks.jsonl"), str(tmp_path / "second.jsonl"), save_to_db=False)
+
+    asyncio.run(first.run())
+    metrics.incr("search_cache_hits_total")
+    asyncio.run(second.run())
+
+    assert first.progress()["search_cache_hits"] == 3
+    assert second.progress()["search_cache_hits"] == 3
+
+
+def test_finished_batch_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(main, "MAX_FINISHED_BATCH_JOBS", 2)
+    monkeypatch.setattr(main, "batch_jobs", {})
+    monkeypatch.setattr(main, "batch_tasks", {"running": None})
+    for batch_id, finished_at in [("old", 1.0), ("running", None), ("newer", 3.0), ("newest", 4.0)]:
+        runner = batch.BatchRunner("in.jsonl", "out.jsonl")
+        runner.finished_at = finished_at
+        main.batch_jobs[batch_id] = runner
+
+    main._prune_batch_jobs()
+
+    assert list(main.batch_jobs) == ["running", "newer", "newest"]
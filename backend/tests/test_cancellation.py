@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+
+import src.main as main
+
+
+class SlowGraph:
+    """Graph stub whose first event never arrives in time"""
+
+    async def astream_events(self, state, version):
+        await asyncio.sleep(10)
+        yield {}
+
+
+def _collect(run: main.ActiveRun):
+    async def collect():
+        return [event async for event in main._run_research(main.ResearchRequest(task="hello world"), run)]
+    return asyncio.run(asyncio.wait_for(collect(), timeout=2))
+
+
+def test_cancel_before_graph_starts_ends_stream(monkeypatch):
+    monkeypatch.setattr(main, "get_graph", lambda: SlowGraph())
+    run = main.ActiveRun("cancelled-early")
+    run.cancel("user")
+
+    events = _collect(run)
+
+    assert '"type": "cancelled"' in events[-1]
+    assert run.graph_task is None
+
+
+def test_cancel_while_graph_running_ends_stream(monkeypatch):
+    monkeypatch.setattr(main, "get_graph", lambda: SlowGraph())
+    run = main.ActiveRun("cancelled-running")
+
+    async def collect():
+        asyncio.get_running_loop().call_later(0.1, run.cancel, "user")
+        return [event async for event in main._run_research(main.ResearchRequest(task="hello world"), run)]
+
+    events = asyncio.run(asyncio.wait_for(collect(), timeout=2))
+
+    assert '"type": "cancelled"' in events[-1]
+    assert run.graph_task.cancelled()
+
+
+class FakeRequest:
+    def __init__(self, disconnected: bool):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def _counter(name):
+    return main.metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_client_disconnect_cancels_run_and_records_metrics(monkeypatch):
+    monkeypatch.setattr(main, "get_graph", lambda: SlowGraph())
+
+    async def scenario():
+        monkeypatch.setattr(main, "research_semaphore", asyncio.Semaphore(1))
+        response = await main.stream_research(main.ResearchRequest(task="hello world"), FakeRequest(disconnected=True))
+        return [event async for event in response.body_iterator], main.research_semaphore
+
+    before = _counter("research_cancelled_total.disconnect")
+    events, semaphore = asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+    assert '"type": "cancelled"' in events[-1]
+    assert _counter("research_cancelled_total.disconnect") == before + 1
+    assert not semaphore.locked()
+
+
+def test_stream_cancelled_by_server_counts_as_disconnect(monkeypatch):
+    monkeypatch.setattr(main, "get_graph", lambda: SlowGraph())
+    observed_before = main.metrics.snapshot()["observations"].get("cancel_to_release_seconds", {}).get("count", 0)
+
+    async def scenario():
+        monkeypatch.setattr(main, "research_semaphore", asyncio.Semaphore(1))
+        response = await main.stream_research(main.ResearchRequest(task="hello world"), FakeRequest(disconnected=False))
+        run = next(iter(main.active_tasks.values()))
+
+        async def consume():
+            async for _ in response.body_iterator:
+                pass
+
+        # Starlette cancels the response task when it sees the disconnect first
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        consumer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await consumer
+        return run
+
+    before = _counter("research_cancelled_total.disconnect")
+    run = asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+    assert run.cancel_reason == "disconnect"
+    assert run.graph_task.cancelled()
+    assert _counter("research_cancelled_total.disconnect") == before + 1
+    assert main.metrics.snapshot()["observations"]["cancel_to_release_seconds"]["count"] == observed_before + 1
+    assert run.session_id not in main.active_tasks
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import time
+
+import src.batch as batch
+import src.main as main
+
+
+class DeadlineGraph:
+    """Graph stub where an early phase and the reporter both hit the deadline"""
+
+    async def astream_events(self, state, version):
+        for name in ("planner", "reviewer", "reporter"):
+            yield {"event": "on_chain_end", "name": name, "data": {"output": {"deadline_reached": True}}}
+
+
+def test_reporter_deadline_trim_is_reported(monkeypatch):
+    monkeypatch.setattr(main, "get_graph", lambda: DeadlineGraph())
+
+    async def collect():
+        return [event async for event in main._run_research(main.ResearchRequest(task="hello world"), main.ActiveRun("deadline"))]
+
+    events = asyncio.run(collect())
+
+    degraded = [json.loads(e[len("data: "):]) for e in events if '"degraded"' in e]
+    assert [(e["reason"], e["phase"]) for e in degraded] == [("deadline", "planner"), ("deadline", "reporter")]
+
+
+def test_batch_tasks_get_the_run_deadline(monkeypatch, tmp_path):
+    states = []
+
+    class RecordingGraph:
+        async def ainvoke(self, state):
+            states.append(state)
+            return {"report_content": "", "notes": []}
+
+    monkeypatch.setattr(batch, "get_graph", lambda: RecordingGraph())
+    tasks = tmp_path / "tasks.jsonl"
+    tasks.write_text(json.dumps({"task": "hello world"}) + "\n", encoding="utf-8")
+
+    asyncio.run(batch.BatchRunner(str(tasks), str(tmp_path / "out.jsonl"), save_to_db=False).run())
+
+    assert len(states) == 1
+    remaining = states[0]["deadline"] - time.time()
+    assert 0 < remaining <= batch.settings.RUN_DEADLINE_SECONDS
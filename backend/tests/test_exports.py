@@ -0,0 +1,39 @@
+import json
+
+from src.db_models import ResearchSession
+from src.exports import render_markdown, render_html
+
+
+def _session(report: str, notes=None) -> ResearchSession:
+    return ResearchSession(id=1, task="<b>task</b>", report_content=report, notes_json=json.dumps(notes or []))
+
+
+def test_render_markdown_links_only_http_citations():
+    item = _session(
+        "A [Source 1(https://example.com/a)] B [Source 2(javascript:void0)] C [Source 3 (data:text/html,x)]",
+        [{"url": "https://example.com/a", "title": "Example [A]"}],
+    )
+
+    text = render_markdown(item)
+
+    assert "[[1]](https://example.com/a)" in text
+    assert "javascript:" not in text
+    assert "data:" not in text
+    assert "1. [Example \\[A\\]](https://example.com/a)" in text
+    assert "3. Source 3" in text
+
+
+def test_render_html_strips_raw_html():
+    item = _session(
+        "# Report\n\n<script>alert(1)</script>\n\n<img src=x onerror=alert(1)>\n\n"
+        "[click](javascript:alert(1)) and [ok](https://example.com)"
+    )
+
+    page = render_html(item, render_markdown(item))
+
+    assert "<script>alert" not in page
+    assert "onerror" not in page
+    assert "javascript:" not in page
+    assert 'href="https://example.com"' in page
+    assert "<h1>Report</h1>" in page
+    assert "&lt;b&gt;task&lt;/b&gt;" in page
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+import src.main as main
+from src.db_models import ResearchSession
+from src.exports import build_export
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        item = ResearchSession(
+            task="task",
+            report_content="# Report\n\n<script>alert(1)</script> [Source 1(https://example.com)]",
+            notes_json="[]",
+            created_at=datetime.now(timezone.utc),
+        )
+        session.add(item)
+        session.commit()
+        session.refresh(item)
+        session.add(build_export(item))
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    main.app.dependency_overrides[main.get_session] = get_session
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statements(engine):
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: seen.append(sql))
+    return seen
+
+
+@pytest.mark.parametrize("url", ["/history/1?part=report", "/history/1/export?format=html"])
+def test_matching_etag_only_reads_the_etag_column(client, statements, url):
+    etag = client.get(url).headers["etag"]
+    statements.clear()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert len(statements) == 1
+    assert "researchexport.etag" in statements[0]
+    assert "researchexport.html" not in statements[0]
+    assert "researchsession" not in statements[0]
+
+
+def test_html_export_is_sanitized_and_sent_with_csp(client):
+    response = client.get("/history/1/export?format=html")
+
+    assert response.status_code == 200
+    assert response.headers["content-security-policy"].startswith("default-src 'none'")
+    assert "<script>" not in response.text
+    assert 'href="https://example.com"' in response.text
+
+
+@pytest.mark.parametrize("header, encoding", [
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, identity", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip; q=0.0, deflate", None),
+    ("br;q=0, gzip;q=1", "gzip"),
+])
+def test_compression_honours_zero_quality(client, monkeypatch, header, encoding):
+    monkeypatch.setattr(main, "COMPRESSION_MIN_SIZE", 0)
+
+    response = client.get("/history/1/export", headers={"Accept-Encoding": header})
+
+    assert response.headers.get("content-encoding") == encoding
+    assert response.text.startswith("# Report")
+
+
+def test_accepted_encodings_parses_quality_values():
+    assert main._accepted_encodings("br;q=0, gzip;q=0.8, *;q=0.1, identity") == {"gzip", "*", "identity"}
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.agents import researcher
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    class CountingLLM:
+        async def ainvoke(self, messages, **kwargs):
+            calls.append(messages)
+            return AIMessage(content=f"要点 {len(calls)} [P1]")
+
+    async def search(query, max_results=3):
+        return [{"url": "https://example.com", "title": "Example", "content": f"{query} 的搜索摘要内容"}]
+
+    monkeypatch.setattr(researcher, "get_llm", lambda json_mode=False: CountingLLM())
+    monkeypatch.setattr(researcher.search_tool, "search", search)
+    return calls
+
+
+def test_notes_are_not_cached_outside_a_scope(llm_calls):
+    async def scenario():
+        first = await researcher.process_query("MoE", "task")
+        second = await researcher.process_query("MoE", "task")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert len(llm_calls) == 2
+    assert first[0].content != second[0].content
+
+
+def test_notes_cache_is_shared_within_a_scope_and_dropped_after(llm_calls):
+    async def scenario():
+        with researcher.notes_cache_scope() as cache:
+            # Child tasks (graph nodes, speculative extraction) see the same cache
+            await asyncio.create_task(researcher.process_query("MoE", "task"))
+            await asyncio.create_task(researcher.process_query("MoE", "task"))
+        assert len(cache) == 1
+        await researcher.process_query("MoE", "task")
+
+    asyncio.run(scenario())
+
+    assert len(llm_calls) == 2
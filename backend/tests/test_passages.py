@@ -0,0 +1,106 @@
+from pathlib import Path
+
+from src.agents.researcher import attribute_notes
+from src.tools.passages import Passage, html_to_text, split_passages, select_passages
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_html_to_text_drops_boilerplate_and_keeps_paragraphs():
+    text = html_to_text(_fixture("moe_article.html"))
+
+    assert "window.analytics" not in text
+    assert "font-family" not in text
+    assert "关于我们" not in text
+    assert "笔记本电脑" not in text
+    assert "版权所有" not in text
+    assert "JavaScript" not in text
+
+    paragraphs = text.split("\n\n")
+    assert paragraphs[0] == "DeepSeek MoE 架构解析"
+    assert any(p.startswith("DeepSeek MoE 将专家切分得更细") for p in paragraphs)
+
+
+def test_split_passages_merges_short_and_drops_tiny_paragraphs():
+    text = html_to_text(_fixture("vector_db.html"))
+
+    passages = split_passages(text, max_tokens=60)
+
+    assert len(passages) == 2
+    assert passages[0].startswith("Vector database index structures HNSW")
+    assert passages[1].startswith("IVF partitions")
+    # Short trailing items are merged into the previous passage, not emitted on their own
+    assert passages[1].endswith("Sign up for our newsletter Share")
+    assert split_passages("Share\n\nSign up for our newsletter") == []
+
+
+def test_split_passages_splits_long_paragraph_on_sentences():
+    text = "。".join(f"第{i}句关于专家路由的说明内容" for i in range(30)) + "。"
+
+    passages = split_passages(text, max_tokens=50, min_tokens=1)
+
+    assert len(passages) > 1
+    assert "".join(passages).replace(" ", "") == text
+
+
+def test_select_passages_ranks_relevant_passages_within_budget():
+    results = [
+        {"url": "https://vec.example.com", "title": "Vector DB", "content": "", "raw_content": _fixture("vector_db.html")},
+        {"url": "https://moe.example.com", "title": "MoE", "content": "共享专家承载通用知识", "raw_content": _fixture("moe_article.html")},
+    ]
+
+    passages = select_passages("共享专家 路由专家", results, token_budget=200)
+
+    assert passages
+    assert passages[0].url == "https://moe.example.com"
+    assert "共享专家" in passages[0].text
+    assert [p.score for p in passages] == sorted((p.score for p in passages), reverse=True)
+    assert sum(len(p.text) for p in passages) < len(html_to_text(_fixture("moe_article.html")))
+
+
+def test_attribute_notes_groups_lines_by_cited_source():
+    passages = [
+        Passage(text="a", url="https://a.com", title="A", score=4.0),
+        Passage(text="b", url="https://b.com", title="B", score=2.0),
+        Passage(text="c", url="https://a.com", title="A", score=1.0),
+    ]
+    content = "- 第一条 [P1]\n\n- 第二条 [P2]\n- 第三条 [P3]\n- 未标注的要点\n- 越界引用 [P9]"
+
+    notes = attribute_notes(content, passages)
+
+    by_url = {note.source_url: note for note in notes}
+    assert list(by_url) == ["https://a.com", "https://b.com"]
+    assert by_url["https://a.com"].content == "- 第一条\n- 第三条\n- 未标注的要点\n- 越界引用"
+    assert by_url["https://a.com"].relevance == 1.0
+    assert by_url["https://b.com"].content == "- 第二条"
+    assert by_url["https://b.com"].relevance == 0.5
+
+
+
+def test_select_passages_falls_back_when_query_shares_no_tokens():
+    results = [
+        {"url": f"https://example.com/{i}", "title": f"Page {i}", "content": f"Snippet {i} about mixture of experts routing.",
+         "raw_content": _fixture("vector_db.html")}
+        for i in range(3)
+    ]
+
+    passages = select_passages("混合专家 优势", results, token_budget=2000)
+
+    assert all(p.score == 0 for p in passages)
+    # Every Tavily snippet comes first, then page passages in document order
+    assert [p.text for p in passages[:3]] == [f"Snippet {i} about mixture of experts routing." for i in range(3)]
+    assert passages[3].text.startswith("Vector database index structures")
+    assert len(passages) == 4
+
+
+def test_select_passages_fallback_respects_token_budget():
+    results = [{"url": f"https://example.com/{i}", "title": f"Page {i}", "content": "word " * 40} for i in range(3)]
+    results = [dict(r, content=r["content"] + str(i)) for i, r in enumerate(results)]
+
+    passages = select_passages("混合专家", results, token_budget=120)
+
+    assert len(passages) == 2
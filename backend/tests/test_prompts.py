@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.agents import researcher, reviewer
+from src.models import Note
+
+TASK = "分析 DeepSeek MoE 架构的核心优势"
+
+
+class RecordingLLM:
+    """LLM stub that records the messages of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls.append(messages)
+        return AIMessage(content="要点 [P1]")
+
+    async def astream(self, messages, **kwargs):
+        self.calls.append(messages)
+        yield AIMessageChunk(content='{"satisfactory": true, "feedback": "ok", "new_queries": []}')
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = RecordingLLM()
+
+    async def search(query, max_results=3):
+        return [{"url": f"https://example.com/{query}", "title": query, "content": f"{query} 的搜索摘要内容"}]
+
+    monkeypatch.setattr(researcher, "get_llm", lambda json_mode=False: fake)
+    monkeypatch.setattr(reviewer, "get_llm", lambda json_mode=False: fake)
+    monkeypatch.setattr(researcher.search_tool, "search", search)
+    return fake
+
+
+def _assert_stable_prefix(first, second):
+    assert [m.content for m in first[:2]] == [m.content for m in second[:2]]
+    assert [type(m) for m in first[:2]] == [type(m) for m in second[:2]]
+    assert first[2].content != second[2].content
+
+
+def test_researcher_calls_share_prompt_prefix(llm):
+    async def scenario():
+        await researcher._run_query("MoE 路由机制", TASK, 3, "key-1")
+        await researcher._run_query("MoE 训练成本", TASK, 3, "key-2")
+
+    asyncio.run(scenario())
+
+    assert len(llm.calls) == 2
+    _assert_stable_prefix(*llm.calls)
+
+
+def test_reviewer_calls_share_prompt_prefix(llm):
+    def state(notes):
+        return {"task": TASK, "notes": notes, "review_count": 0, "max_loops": 3, "deadline": None, "run_id": "run"}
+
+    first = [Note(content="专家路由", source_url="https://a.com", source_title="A", relevance=1.0)]
+    second = first + [Note(content="负载均衡", source_url="https://b.com", source_title="B", relevance=0.5)]
+
+    async def scenario():
+        await reviewer.reviewer_node(state(first))
+        await reviewer.reviewer_node(state(second))
+
+    asyncio.run(scenario())
+
+    assert len(llm.calls) == 2
+    _assert_stable_prefix(*llm.calls)
@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import src.main as main
+
+
+def test_ready_only_reports_startup_state(monkeypatch):
+    calls = []
+
+    async def warmup():
+        calls.append(1)
+        return {"llm": "ok", "search": "ok"}
+
+    monkeypatch.setattr(main, "warmup", warmup)
+    monkeypatch.setitem(main.startup_state, "ready", False)
+    monkeypatch.setitem(main.startup_state, "checks", {"llm": "error: ConnectError"})
+
+    response = TestClient(main.app).get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["checks"] == {"llm": "error: ConnectError"}
+    assert calls == []
+
+
+def test_warmup_is_retried_in_background_until_ready(monkeypatch):
+    results = iter([{"llm": "error: ConnectError"}, {"llm": "error: ConnectError"}, {"llm": "ok"}])
+
+    async def warmup():
+        return next(results)
+
+    monkeypatch.setattr(main, "warmup", warmup)
+    monkeypatch.setattr(main, "WARMUP_RETRY_INITIAL", 0.01)
+    monkeypatch.setitem(main.startup_state, "ready", False)
+    monkeypatch.setitem(main.startup_state, "warmup_attempts", 0)
+
+    asyncio.run(asyncio.wait_for(main._retry_warmup(), timeout=2))
+
+    assert main.startup_state["ready"] is True
+    assert main.startup_state["warmup_attempts"] == 3
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+from tavily import AsyncTavilyClient
+
+from src.tools.search import SearchTool
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.queries = []
+
+    async def search(self, query, **kwargs):
+        self.queries.append(query)
+        return {"results": [{"url": query}]}
+
+
+def test_search_cache_evicts_least_recently_used(monkeypatch):
+    tool = SearchTool(cache_size=2)
+    client = FakeAsyncClient()
+    monkeypatch.setattr(tool, "_async_client", client)
+
+    async def scenario():
+        for query in ["a", "b", "a", "c", "a", "b"]:
+            await tool.search(query)
+
+    asyncio.run(scenario())
+
+    # "b" was the least recently used entry when "c" was added
+    assert client.queries == ["a", "b", "c", "b"]
+    assert len(tool._cache) == 2
+
+
+def test_warmup_starts_every_worker_thread(monkeypatch):
+    tool = SearchTool(max_workers=4)
+    monkeypatch.setattr(tool, "_client", object())
+    monkeypatch.setattr(tool, "_async_client", object())
+
+    tool.warmup()
+
+    assert len(tool.executor._threads) == 4
+    tool.executor.shutdown()
+
+
+def test_cancelling_a_search_aborts_the_http_request(monkeypatch):
+    started = asyncio.Event()
+    aborted = []
+
+    async def handler(request):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            aborted.append(request.url.path)
+            raise
+        return httpx.Response(200, json={"results": []})
+
+    async def scenario():
+        tool = SearchTool()
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://api.tavily.com")
+        monkeypatch.setattr(tool, "_async_client", AsyncTavilyClient(api_key="tvly-test", client=http))
+        search = asyncio.create_task(tool.search("MoE"))
+        await asyncio.wait_for(started.wait(), timeout=2)
+        search.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await search
+        await http.aclose()
+        return tool
+
+    tool = asyncio.run(scenario())
+
+    assert aborted == ["/search"]
+    assert tool._cache == {}
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+import src.batch as batch
+import src.main as main
+from src.agents import researcher
+
+
+@pytest.fixture
+def slow_search(monkeypatch):
+    async def search(query, max_results=3):
+        await asyncio.sleep(10)
+        return []
+
+    monkeypatch.setattr(researcher.search_tool, "search", search)
+    monkeypatch.setattr(researcher, "_speculative", {})
+
+
+def _state(run_id, queries):
+    return {"task": "same task", "sub_queries": queries, "notes": [], "max_results": 3, "deadline": None, "run_id": run_id}
+
+
+def test_speculative_queries_are_keyed_per_run(slow_search):
+    async def scenario():
+        key_a = researcher.start_speculative_query("q", "same task", 3, "run-a")
+        key_b = researcher.start_speculative_query("q", "same task", 3, "run-b")
+        task_a = researcher._speculative[key_a][0]
+
+        # Run B finishing (and cancelling its leftovers) must not touch run A
+        researcher.cancel_run_speculative("run-b")
+        await asyncio.sleep(0)
+        assert key_a != key_b
+        assert key_a in researcher._speculative
+        assert not task_a.cancelled()
+        researcher.cancel_run_speculative("run-a")
+
+    asyncio.run(scenario())
+
+
+def test_researcher_cancels_speculation_when_a_query_fails(slow_search, monkeypatch):
+    async def failing_process_query(query, task, max_results=3, run_id=""):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(researcher, "process_query", failing_process_query)
+
+    async def scenario():
+        key = researcher.start_speculative_query("next", "same task", 3, "run-a")
+        spec_task = researcher._speculative[key][0]
+        with pytest.raises(RuntimeError):
+            await researcher.researcher_node(_state("run-a", ["first", "next"]))
+        await asyncio.sleep(0)
+        assert researcher._speculative == {}
+        assert spec_task.cancelled()
+
+    asyncio.run(scenario())
+
+
+class ReviewerThenStallGraph:
+    """Graph stub: the reviewer starts a speculative search, then the run stops before the researcher"""
+
+    def __init__(self):
+        self.spec_tasks = []
+
+    def _start(self, state):
+        key = researcher.start_speculative_query("next", state["task"], 3, state["run_id"])
+        self.spec_tasks.append(researcher._speculative[key][0])
+
+    async def astream_events(self, state, version):
+        self._start(state)
+        yield {"event": "on_chain_end", "name": "reviewer", "data": {"output": {"sub_queries": ["next"]}}}
+        await asyncio.sleep(10)
+
+    async def ainvoke(self, state):
+        self._start(state)
+        raise RuntimeError("graph failed")
+
+
+def test_cancelling_between_reviewer_and_researcher_stops_speculation(slow_search, monkeypatch):
+    graph = ReviewerThenStallGraph()
+    monkeypatch.setattr(main, "get_graph", lambda: graph)
+    run = main.ActiveRun("between-nodes")
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(0.1, run.cancel, "user")
+        events = [e async for e in main._run_research(main.ResearchRequest(task="same task"), run)]
+        await asyncio.sleep(0)
+        return events
+
+    events = asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+    assert '"type": "cancelled"' in events[-1]
+    assert researcher._speculative == {}
+    assert graph.spec_tasks[0].cancelled()
+
+
+def test_failed_batch_task_stops_speculation(slow_search, monkeypatch, tmp_path):
+    graph = ReviewerThenStallGraph()
+    monkeypatch.setattr(batch, "get_graph", lambda: graph)
+    (tmp_path / "tasks.jsonl").write_text(json.dumps({"task": "same task"}) + "\n", encoding="utf-8")
+
+    async def scenario():
+        await batch.BatchRunner(str(tmp_path / "tasks.jsonl"), str(tmp_path / "out.jsonl"), save_to_db=False).run()
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert researcher._speculative == {}
+    assert graph.spec_tasks[0].cancelled()